@@ -1,9 +1,11 @@
 import math
+import os
 from pick import pick
 import numpy as np
 import pandas as pd
 import statistics
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib import pyplot as plt
 import seaborn as sns
 from datetime import datetime, timedelta
@@ -11,21 +13,67 @@ import scipy.stats as stats
 from scipy.interpolate import InterpolatedUnivariateSpline
 
 
-def open_database(name, date):
+GENDERS = {'male': 'm', 'female': 'f'}
+STATUSES = {'slave': 0, 'freed': 1, 'free': 2}
+PROVINCE_FIX = {"Belgica | Germania inferior": "Belgica",
+                "Belgica | Germania superior": "Belgica",
+                "Aquitani(c)a": "Aquitania",
+                "Aquitani": "Aquitania"}
+ITALY = frozenset(['Latium et Campania / Regio I',
+                   'Apulia et Calabria / Regio II',
+                   'Bruttium et Lucania / Regio III', 'Samnium / Regio IV',
+                   'Picenum / Regio V', 'Umbria / Regio VI',
+                   'Etruria / Regio VII', 'Aemilia / Regio VIII',
+                   'Liguria / Regio IX', 'Venetia et Histria / Regio X',
+                   'Transpadana / Regio XI'])
+CATEGORICAL = {'gender': pd.CategoricalDtype(['m', 'f'], ordered=True),
+               'legal_status': 'category', 'province': 'category'}
+NARROW = {'distance': 'float32', 'text_length': 'float32',
+          'funerary': 'Int8', 'contains_name': 'Int8'}
+ANALYSIS_COLUMNS = ['gender', 'legal_status', 'funerary', 'contains_name',
+                    'text_length', 'distance', 'findspot', 'province',
+                    'origo', 'time_from', 'time_to']
+
+
+def read_cached(filename, columns=None):
+    """
+    Reads a csv file, preferring a feather copy of it.
+    Takes in the name of a csv file and optionally a list of columns.
+    If a feather file of the same name exists and is not older than the csv,
+    reads only the requested columns from it; otherwise reads the csv and
+    saves a feather copy for the next run.
+    Returns the pandas dataframe.
+    """
+    cache = filename.replace('.csv', '.feather')
+    if os.path.exists(cache) and \
+            (not os.path.exists(filename) or
+             os.path.getmtime(cache) >= os.path.getmtime(filename)):
+        return pd.read_feather(cache, columns=columns)
+    database = pd.read_csv(filename, engine='pyarrow')
+    database.to_feather(cache)
+    if columns is not None:
+        database = database[columns]
+    return database
+
+
+def open_database(name, date, columns=None):
     """
     Opens csv database and returns it as a pandas dataframe.
-    Takes in the name of the database and today's date.
-    Searches for the most recent version of the database; returns it.
+    Takes in the name of the database, today's date, and optionally
+    the list of columns needed.
+    Searches for the most recent version of the database by checking
+    which files exist, and reads only that one; returns it.
     """
-    searching = True
-    while searching:
-        date_str = date.strftime('%Y-%m-%d')
-        filename = f"{name}_{date_str}.csv"
-        try:
-            database = pd.read_csv(filename)
-            searching = False
-        except FileNotFoundError:
-            date = (date - timedelta(days=1))
+    while True:
+        filename = f"{name}_{date.strftime('%Y-%m-%d')}.csv"
+        if os.path.exists(filename) or \
+                os.path.exists(filename.replace('.csv', '.feather')):
+            break
+        date = (date - timedelta(days=1))
+    database = read_cached(filename, columns)
+    dtypes = {**CATEGORICAL, **NARROW}
+    database = database.astype({column: dtype for column, dtype in
+                                dtypes.items() if column in database})
     print(f"read database {filename}.")
     return database
 
@@ -40,6 +88,66 @@ def save_database(database, today, name):
     print(f"Saved {name} database to csv.")
 
 
+def fast_describe(values, perc=(.25, .5, .75), name=None):
+    """
+    Describes an array of values like describe() does.
+    Takes in a numpy array or pandas series, the percentiles, and optionally
+    the name of the result.
+    Drops missing values and computes all percentiles, the minimum and the
+    maximum with a single call to np.quantile.
+    Returns a series with count, mean, std, min, the percentiles and max.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    index = ['count', 'mean', 'std', 'min',
+             *[f'{p:.0%}' for p in perc], 'max']
+    if values.size == 0:
+        return pd.Series([0] + [np.nan] * (len(index) - 1), index=index,
+                         dtype=np.float64, name=name)
+    std = values.std(ddof=1) if values.size > 1 else np.nan
+    quantiles = np.quantile(values, [0, *perc, 1])
+    return pd.Series([values.size, values.mean(), std, *quantiles],
+                     index=index, dtype=np.float64, name=name)
+
+
+def describe_groups(data, columns, perc):
+    """
+    Describes columns of a dataframe for each gender and legal status.
+    Takes in a pandas dataframe, a list of column names, and the percentiles.
+    Groups the dataframe once by gender and once by legal status, and
+    describes the rows of each group with fast_describe.
+    Returns a dictionary containing, for each column, a dictionary with
+    the description of each group.
+    """
+    by_gender = data.groupby('gender', observed=True).indices
+    by_status = data.groupby('legal_status', observed=True).indices
+    groups = {k: by_gender.get(v, []) for k, v in GENDERS.items()}
+    groups.update({k: by_status.get(v, []) for k, v in STATUSES.items()})
+    descriptions = {}
+    for column in columns:
+        values = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        descriptions[column] = {k: fast_describe(values[rows], perc, column)
+                                for k, rows in groups.items()}
+    return descriptions
+
+
+def trimmed_describe(series, frac=0.1):
+    """
+    Describes a column after trimming its lowest and highest values.
+    Takes in a pandas series and the fraction to trim at each end.
+    Partitions the values around the trimming boundaries instead of sorting
+    them, and describes the remaining values with fast_describe.
+    Returns them as a series laid out like the output of describe().
+    """
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[~np.isnan(values)]
+    trim = int(frac * values.size)
+    if trim:
+        values = np.partition(values, [trim, values.size - trim - 1])
+        values = values[trim:values.size - trim]
+    return fast_describe(values)
+
+
 def descriptive_statistics(master):
     all_mig = (master['contains_name'] == 1) | (master['contains_name'] == 0)
     funerary = master['funerary'] == 1
@@ -62,18 +170,21 @@ def descriptive_statistics(master):
     master_fun = master[funerary]
 
     # Summary statistics for socioeconomic status
-    for k, v in groups.items():
-        description = master[funerary & v]['text_length'].describe(percentiles=perc)
+    descriptions = {'all': fast_describe(
+        master_fun[all_mig[funerary]]['text_length'], perc, 'text_length')}
+    descriptions.update(describe_groups(master_fun, ['text_length'],
+                                        perc)['text_length'])
+    descriptions['funerary'] = fast_describe(master_fun['text_length'], perc,
+                                             'text_length')
+    for k, description in descriptions.items():
         print(f'\nSummary SOCIOECONOMIC STATUS statistics for FUNERARY '
               f'{k.capitalize()}: \n{description}')
 
     # Summary statistics for TRIMMED socioeconomic status
     for k, v in groups.items():
-        result = np.array(sorted(master[funerary & v]['text_length'].dropna()))
-        trim = int(10 * result.size / 100)
-        trimmed = pd.Series(result[trim:-trim])
+        trimmed = trimmed_describe(master[funerary & v]['text_length'])
         print(f'\nTrimmed descriptive SOCIOECONOMIC STATUS statistics for '
-              f'{k.capitalize()}: \n{trimmed.describe()}')
+              f'{k.capitalize()}: \n{trimmed}')
 
 
 def migrant_statistics(migrants):
@@ -86,60 +197,82 @@ def migrant_statistics(migrants):
     groups = {'all': all_mig, 'male': male, 'female': female,
               'slave': slave, 'freed': freed, 'free': free}
     perc = [.1, .25, .5, .75, .9]
+    columns = ['distance', 'text_length']
+    descriptions = describe_groups(migrants, columns, perc)
+    overall = migrants[all_mig]
+    for column in columns:
+        descriptions[column] = {'all': fast_describe(overall[column], perc,
+                                                     column),
+                                **descriptions[column]}
 
     # summary statistics for distance
     t = stats.ttest_ind(migrants[male]['distance'],
                         migrants[female]['distance'],
                         equal_var=False, nan_policy='omit')
     print(t)
-    for k, v in groups.items():
-        description = migrants[v]['distance'].describe(percentiles=perc)
+    for k, description in descriptions['distance'].items():
         print(f'\nSummary DISTANCE statistics for {k.capitalize()}:\n'
               f'{description}')
 
     # Trimmed statistics for distance
     for k, v in groups.items():
-        result = np.array(sorted(migrants[v]['distance'].dropna()))
-        trim = int(10 * result.size / 100)
-        trimmed = pd.Series(result[trim:-trim])
+        trimmed = trimmed_describe(migrants[v]['distance'])
         print(f'\nTrimmed descriptive DISTANCE statistics for '
-              f'{k.capitalize()}: \n{trimmed.describe()}')
+              f'{k.capitalize()}: \n{trimmed}')
 
     # Summary statistics for socioeconomic status
     t = stats.ttest_ind(migrants[male]['text_length'],
                         migrants[female]['text_length'],
                         equal_var=False, nan_policy='omit')
     print(t)
-    for k, v in groups.items():
-        description = migrants[v]['text_length'].describe(percentiles=perc)
+    for k, description in descriptions['text_length'].items():
         print(f'\nSummary SOCIOECONOMIC STATUS statistics for '
               f'{k.capitalize()}: \n{description}')
 
     # Trimmed statistics for socioeconomic status
     for k, v in groups.items():
-        result = np.array(sorted(migrants[v]['text_length'].dropna()))
-        trim = int(10 * result.size / 100)
-        trimmed = pd.Series(result[trim:-trim])
+        trimmed = trimmed_describe(migrants[v]['text_length'])
         print(f'\nTrimmed descriptive SOCIOECONOMIC STATUS statistics for '
-              f'{k.capitalize()}: \n{trimmed.describe()}')
+              f'{k.capitalize()}: \n{trimmed}')
 
     # most common destinations:
-    groups = {'all': all_mig, 'male': male, 'female': female}
-    for k, v in groups.items():
-        migrants[v]['findspot'].value_counts().reset_index().to_csv(f'Finspot_'
-                                                                    f'{k}.csv')
-        migrants[v]['province'].value_counts().reset_index().to_csv(f'Province_'
-                                                                    f'{k}.csv')
-        migrants[v]['origo'].value_counts().reset_index().to_csv(f'Origo_'
-                                                                 f'{k}.csv')
+    files = {'findspot': 'Finspot', 'province': 'Province', 'origo': 'Origo'}
+    writes = []
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for column, prefix in files.items():
+            by_gender = migrants.groupby([column, 'gender'], observed=True).size()
+            by_gender = by_gender.unstack('gender', fill_value=0)
+            by_gender = by_gender.reindex(columns=list(GENDERS.values()),
+                                          fill_value=0)
+            counts = {'all': migrants[all_mig][column].value_counts()}
+            for k, v in GENDERS.items():
+                counts[k] = by_gender[v]
+            for k, count in counts.items():
+                count = count[count > 0].sort_values(ascending=False)
+                count = count.rename('count').reset_index()
+                writes.append(executor.submit(count.to_csv,
+                                              f'{prefix}_{k}.csv'))
+    for write in writes:
+        write.result()
+
+
+def compare_distances(men, women):
+    """
+    Prints the p-values of tests comparing the distances of men and women.
+    Takes in two pandas series without missing values.
+    Converts both to numpy arrays once for the three tests.
+    """
+    men = men.to_numpy(dtype=np.float64)
+    women = women.to_numpy(dtype=np.float64)
+    print(f'Mann Whitney: {round(stats.mannwhitneyu(men, women)[1], 3)}')
+    print(f'T-Test: {round(stats.ttest_ind(men, women)[1], 3)}')
+    print(f'Kolmogorow-Smirnow: {round(stats.ks_2samp(men, women)[1], 3)}')
 
 
 def get_stats(edcs):
     men = edcs[edcs['gender'] == 'm']['distance'].dropna()
     women = edcs[edcs['gender'] == 'f']['distance'].dropna()
-    print(f'Mann Whitney: {round(stats.mannwhitneyu(men, women)[1], 3)}')
-    print(f'T-Test: {round(stats.ttest_ind(men, women)[1], 3)}')
-    print(f'Kolmogorow-Smirnow: {round(stats.ks_2samp(men, women)[1], 3)}')
+    compare_distances(men, women)
 
 
 def time_stats(edcs):
@@ -147,58 +280,53 @@ def time_stats(edcs):
     sns.set_style('white')
     edcs['time'] = (edcs['time_from'] + edcs['time_to']) / 2
     print(edcs['time_from'].value_counts())
-    edcs = edcs.sort_values(by=['gender'], ascending=True)
     fig, ax = plt.subplots()
-    sns.histplot(data=edcs, x='time_from', binwidth=25, hue='gender', hue_order=['m', 'f'], ax=ax)
+    sns.histplot(data=edcs, x='time_from', binwidth=25, hue='gender', ax=ax)
     ax.set(xlabel='Time (lower bound)', title='Temporal Distribution of Migrants')
     ax.legend(loc='upper right', labels=['female', 'male'])
     plt.show()
 
 
+def plot_kde(distances, ax, label):
+    """
+    Plots the kernel density estimate of migration distances.
+    Takes in a pandas series of distances, the axes, and the legend label.
+    Fits a gaussian kernel density estimate to the distances once and
+    evaluates it on a fixed grid of 200 points, reaching three bandwidths
+    beyond the shortest and the longest distance (as seaborn's kdeplot does).
+    Samples too small to fit an estimate are skipped.
+    """
+    values = distances.dropna().to_numpy(dtype=np.float64)
+    if values.size < 2 or values.min() == values.max():
+        return
+    kde = stats.gaussian_kde(values)
+    bw = kde.factor * values.std(ddof=1)
+    grid = np.linspace(values.min() - 3 * bw, values.max() + 3 * bw, 200)
+    ax.plot(grid, kde(grid), label=label)
+
+
 def overall_plots(edcs):
     sns.set()
     sns.set_style('white')
-    edcs = edcs.sort_values(by=['gender'], ascending=True)
 
     fig, ax = plt.subplots()
-    sns.kdeplot(data=edcs[edcs['gender'] == 'm']['distance'], ax=ax)
-    sns.kdeplot(data=edcs[edcs['gender'] == 'f']['distance'], ax=ax)
+    plot_kde(edcs[edcs['gender'] == 'm']['distance'], ax, 'male')
+    plot_kde(edcs[edcs['gender'] == 'f']['distance'], ax, 'female')
     ax.set(xlabel='Distance (km)', ylabel='Density', title='Distance Migrated')
     ax.legend(loc='upper right')
-    plt.legend(labels=['male', 'female'])
     plt.show()
 
     fig, ax = plt.subplots()
-    sns.histplot(data=edcs, x='distance', binwidth=100, hue='gender', hue_order=['m', 'f'], ax=ax)
+    sns.histplot(data=edcs, x='distance', binwidth=100, hue='gender', ax=ax)
     ax.set(xlabel='Distance (km)', title='Distance Migrated')
     ax.legend(loc='upper right', labels=['female', 'male'])
     plt.show()
 
 
-def set_province(row):
-    italy = ['Latium et Campania / Regio I', 'Apulia et Calabria / Regio II',
-             'Bruttium et Lucania / Regio III', 'Samnium / Regio IV',
-             'Picenum / Regio V', 'Umbria / Regio VI', 'Etruria / Regio VII',
-             'Aemilia / Regio VIII', 'Liguria / Regio IX',
-             'Venetia et Histria / Regio X', 'Transpadana / Regio XI']
-    if row['province'] in italy:
-        return 'Italia'
-    return row['province']
-
-
 def italia(edcs):
-    edcs['province'] = edcs['province'].str.strip()
-    edcs['province'].mask(edcs['province'] == "Belgica | Germania inferior",
-                          "Belgica", inplace=True)
-    edcs['province'].mask(edcs['province'] == "Belgica | Germania superior",
-                          "Belgica", inplace=True)
-    edcs['province'].mask(edcs['province'] == "Aquitani(c)a",
-                          "Aquitania", inplace=True)
-    edcs['province'].mask(edcs['province'] == "Aquitani",
-                          "Aquitania", inplace=True)
-    edcs['province'] = edcs.apply(lambda row: set_province(row), axis=1)
-
-    edcs = edcs.sort_values(by=['gender'], ascending=True)
+    edcs['province'] = edcs['province'].str.strip().replace(PROVINCE_FIX)
+    edcs['province'] = edcs['province'].where(~edcs['province'].isin(ITALY),
+                                              'Italia')
     return edcs
 
 
@@ -207,28 +335,28 @@ def provinces_plots(edcs):
     sns.set_style('white')
 
     provs = ['Italia', 'Roma', 'Lusitania', 'Africa proconsularis', 'Baetica']
-    m = edcs['gender'] == 'm'
-    f = edcs['gender'] == 'f'
+    by_prov = edcs.groupby('province', sort=False, observed=True).indices
 
     for prov in provs:
         # provinces kde plots
-        p = edcs['province'] == prov
+        sub = edcs.iloc[by_prov.get(prov, [])]
+        m = sub['gender'] == 'm'
+        f = sub['gender'] == 'f'
+        men = len(sub[m])
+        women = len(sub[f])
         fig, ax = plt.subplots()
-        sns.kdeplot(data=edcs[p & m]['distance'], ax=ax)
-        sns.kdeplot(data=edcs[p & f]['distance'], ax=ax)
-        men = len(edcs[p & m])
-        women = len(edcs[p & f])
+        plot_kde(sub[m]['distance'], ax, f'male (n={men})')
+        plot_kde(sub[f]['distance'], ax, f'female (n={women})')
         ax.set(xlabel='Distance (km)', ylabel='Density',
                title=f'{prov}: Distance Migrated')
         ax.legend(loc='upper right')
-        plt.legend(labels=[f'male (n={men})', f'female (n={women})'])
         plt.show()
         # plt.savefig(f'KDE_{prov}.png')
         # plt.close()
 
         # provinces histograms
         fig, ax = plt.subplots()
-        sns.histplot(data=edcs[p], x='distance', binwidth=100, hue='gender', hue_order=['m', 'f'], ax=ax)
+        sns.histplot(data=sub, x='distance', binwidth=100, hue='gender', ax=ax)
         ax.set(xlabel='Distance (km)', title=f'{prov}: Distance Migrated')
         ax.legend(loc='upper right', labels=[f'female (n={women})', f'male (n={men})'])
         plt.show()
@@ -237,90 +365,67 @@ def provinces_plots(edcs):
 
 
 def get_stats_prov(edcs):
-    m = edcs['gender'] == 'm'
-    f = edcs['gender'] == 'f'
     provs = ['Italia', 'Roma', 'Lusitania', 'Africa proconsularis', 'Baetica']
+    by_prov = edcs.groupby('province', sort=False, observed=True).indices
 
     for prov in provs:
-        p = edcs['province'] == prov
-        men = edcs[m & p]['distance'].dropna()
-        women = edcs[f & p]['distance'].dropna()
+        sub = edcs.iloc[by_prov.get(prov, [])]
+        men = sub[sub['gender'] == 'm']['distance'].dropna()
+        women = sub[sub['gender'] == 'f']['distance'].dropna()
         print(f'\n{prov.capitalize()}:')
-        print(f'Mann Whitney: {round(stats.mannwhitneyu(men, women)[1], 3)}')
-        print(f'T-Test: {round(stats.ttest_ind(men, women)[1], 3)}')
-        print(f'Kolmogorow-Smirnow: {round(stats.ks_2samp(men, women)[1], 3)}')
+        compare_distances(men, women)
 
 
 def province_statistics(edcs):
-    m = edcs['gender'] == 'm'
-    f = edcs['gender'] == 'f'
-    i = edcs['legal_status'] == 2
-    l = edcs['legal_status'] == 1
-    s = edcs['legal_status'] == 0
-
     provs = ['Italia', 'Roma', 'Lusitania', 'Africa proconsularis', 'Baetica']
     provs = ['Lusitania', 'Africa proconsularis']
+    by_prov = edcs.groupby('province', sort=False, observed=True).indices
 
     for prov in provs:
-        p = edcs['province'] == prov
-        tot = edcs[p]['distance']
-        men = edcs[m & p]['distance']
-        women = edcs[f & p]['distance']
-        m_eco = np.array(sorted(edcs[p & m]['text_length'].dropna()))
-        f_eco = np.array(sorted(edcs[p & f]['text_length'].dropna()))
-        a_eco = np.array(sorted(edcs[p ]['text_length'].dropna()))
-        ingenui = len(edcs[p & i])
-        liberti = len(edcs[p & l])
-        servi = len(edcs[p & s])
-        m_i = len(edcs[p & m & i])
-        m_l = len(edcs[p & m & l])
-        m_s = len(edcs[p & m & s])
-        f_i = len(edcs[p & f & i])
-        f_l = len(edcs[p & f & l])
-        f_s = len(edcs[p & f & s])
+        sub = edcs.iloc[by_prov.get(prov, [])]
+        m = sub['gender'] == 'm'
+        f = sub['gender'] == 'f'
+        tot = sub['distance']
+        men = sub[m]['distance']
+        women = sub[f]['distance']
+        m_eco = sub[m]['text_length']
+        f_eco = sub[f]['text_length']
+        a_eco = sub['text_length']
+        # count legal status of all, men and women with one grouping each
+        overall = sub['legal_status'].value_counts()
+        overall = overall.reindex([2, 1, 0], fill_value=0)
+        counts = sub.groupby(['gender', 'legal_status'], observed=True).size()
+        counts = counts.unstack('legal_status', fill_value=0)
+        counts = counts.reindex(index=['m', 'f'], columns=[2, 1, 0],
+                                fill_value=0)
 
         print(f'\n{prov.capitalize()}: categories alle:')
-        print(f'ingenui: {ingenui}; liberti: {liberti}; servi: {servi}.')
+        print(f'ingenui: {overall[2]}; liberti: {overall[1]}; '
+              f'servi: {overall[0]}.')
         print(f'\n{prov.capitalize()}: categories Männer:')
-        print(f'ingenui: {m_i}; liberti: {m_l}; servi: {m_s}.')
+        print(f'ingenui: {counts.loc["m", 2]}; liberti: {counts.loc["m", 1]}; '
+              f'servi: {counts.loc["m", 0]}.')
         print(f'\n{prov.capitalize()}: categories Frauen:')
-        print(f'ingenui: {f_i}; liberti: {f_l}; servi: {f_s}.')
+        print(f'ingenui: {counts.loc["f", 2]}; liberti: {counts.loc["f", 1]}; '
+              f'servi: {counts.loc["f", 0]}.')
         input('continue? ')
 
-        trim_tot = int(10 * tot.size / 100)
-        trimmed_tot = pd.Series(tot[trim_tot:-trim_tot])
-
-        trim_men = int(10 * men.size / 100)
-        trimmed_men = pd.Series(men[trim_men:-trim_men])
-
-        trim_women = int(10 * women.size / 100)
-        trimmed_women = pd.Series(women[trim_women:-trim_women])
-
         print(f'\n{prov.capitalize()}: Trimmed distance statistics for:')
-        print(f'Alle:\n{trimmed_tot.describe()}\n'
-              f'\nMen:\n{trimmed_men.describe()}\n'
-              f'\nWomen:\n{trimmed_women.describe()}\n')
+        print(f'Alle:\n{trimmed_describe(tot)}\n'
+              f'\nMen:\n{trimmed_describe(men)}\n'
+              f'\nWomen:\n{trimmed_describe(women)}\n')
         input('continue? ')
 
-        trim_tot = int(10 * a_eco.size / 100)
-        trimmed_tot = pd.Series(a_eco[trim_tot:-trim_tot])
-
-        trim_men = int(10 * m_eco.size / 100)
-        trimmed_men = pd.Series(m_eco[trim_men:-trim_men])
-
-        trim_women = int(10 * f_eco.size / 100)
-        trimmed_women = pd.Series(f_eco[trim_women:-trim_women])
-
         print(f'\n{prov.capitalize()}:\nTrimmed socio-econ statistics for:')
-        print(f'Alle:\n{trimmed_tot.describe()}\n'
-              f'\nMen:\n{trimmed_men.describe()}\n'
-              f'\nWomen:\n{trimmed_women.describe()}\n')
+        print(f'Alle:\n{trimmed_describe(a_eco)}\n'
+              f'\nMen:\n{trimmed_describe(m_eco)}\n'
+              f'\nWomen:\n{trimmed_describe(f_eco)}\n')
         input('continue? ')
 
 
 def analyse_inscriptions(today):
-    migrants = open_database('EDCS_Migrants_quick', today)
-    # master = open_database('EDCS_Master_quick', today)
+    migrants = open_database('EDCS_Migrants_quick', today, ANALYSIS_COLUMNS)
+    # master = open_database('EDCS_Master_quick', today, ANALYSIS_COLUMNS)
     # descriptive_statistics(master)
     # migrant_statistics(migrants)
     # get_stats(migrants)
@@ -1,24 +1,48 @@
+import os
+import pickle
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import requests
 import urllib3
-import haversine as hs
+
+
+EARTH_RADIUS = 6371.0088  # mean earth radius in km, as used by haversine
+# words indicating origin; \b word boundary, \w* one or more word chars,
+# (?:x|y)\b ends in x or y; [ag]n covers -anus, -ianus, -itanus and -gnus
+LOCS = re.compile(r'\b\w*ens(?:is|i|em|e|es|ium|ia|ibus)\b|'
+                  r'\b\w*[ag]n(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|'
+                  r'\btrib(?:us|ui|um|u|uum|ibus)\b|'
+                  r'\bciv(?:is|i|em|e|es|ium|ibus)\b|'
+                  r'\bdomo\b|\borigo\b|\bnatione\b|'
+                  r'\bcoloni(?:a|ae|am|arum|is|as)\b')
+# r'\b\w*in(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|'
+# r'\b\w*ic(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|'
+# low-cardinality text columns of the EDCS database
+CATEGORICAL = dict.fromkeys(['province', 'material', 'keywords', 'findspot'],
+                            'category')
+TAGS = re.compile(r'<[^>]*>')
+# omissions, and elements in parentheses which are an entire word
+OMISSIONS = re.compile(r'\(\.\.\.\)|(?<=\s)\([^)]*\)')
+# spelling variants, one for each opening parenthesis
+VARIANTS = re.compile(r'(?=(\([^)]*\)))')
 
 
 def open_database(name, date):
     """
     Opens csv database and returns it as a pandas dataframe.
     Takes in the name of the database and today's date.
-    Searches for the most recent version of the database; returns it.
+    Searches for the most recent version of the database, parses it with
+    the multithreaded pyarrow csv reader, and returns it.
     """
     searching = True
     while searching:
         date_str = date.strftime('%Y-%m-%d')
         filename = f"{name}{date_str}.csv"
         try:
-            database = pd.read_csv(filename)
+            database = pd.read_csv(filename, engine='pyarrow')
             searching = False
         except FileNotFoundError:
             date = (date - timedelta(days=1))
@@ -36,12 +60,37 @@ def save_database(database, today, name):
     print(f"Saved {name} database to csv.")
 
 
-def get_legal_status(row):
+def first_match(text, categories):
     """
-    Takes in a row of the migrants dataframe.
-    Loops over the cleantext, checking each word as to whether it is indicative
-    of legal status. The first such word determines the legal status, and
-    a corresponding number is returned.
+    Takes in a pandas series of lowercase texts and a dictionary which maps
+    column names to dictionaries of (lowercase) words and codes.
+    Extracts all whitespace-delimited words which are in any of the
+    dictionaries with a single compiled alternation over the whole series,
+    and looks up the first word of each text in each dictionary.
+    Returns a dataframe with a column for each dictionary containing the code
+    of that word, -1 if there is none, and NaN where the text is missing.
+    """
+    words = sorted({word for codes in categories.values() for word in codes},
+                   key=len, reverse=True)
+    pattern = r'(?<!\S)(' + '|'.join(map(re.escape, words)) + r')(?!\S)'
+    matches = text.str.extractall(pattern)[0]
+    is_text = text.map(lambda elem: isinstance(elem, str))
+    result = pd.DataFrame(index=text.index)
+    for column, codes in categories.items():
+        first = matches.map(codes).dropna().groupby(level=0).first()
+        result[column] = first.reindex(text.index, fill_value=-1).where(is_text)
+    return result
+
+
+def get_first_words(text):
+    """
+    Takes in the lowercased cleantext column of the EDCS.
+    Looks for the first word of each inscription which is indicative of
+    legal status, the first filiation, and the first servile indicator, all
+    in one pass over the texts.
+    Returns a dataframe with the legal status (0=slave, 1=freed, 2=free) and
+    the gender according to filiation and servile indicator (0=male,
+    1=female) of each inscription; -1 if no such word is found.
     """
     slave = ['servus', 'servi', 'servo', 'servum', 'servom', 'servorum',
              'servis', 'servos', 'serva', 'servae', 'servai', 'servam',
@@ -53,59 +102,70 @@ def get_legal_status(row):
     free = ['filia', 'filiae', 'filiai', 'filiam', 'filiad', 'filiarum',
             'filiabus', 'filias', 'filius', 'fili', 'filii', 'filio',
             'filium', 'filiom', 'filiorum', 'filios']
-    if isinstance(row['cleantext'], str):
-        words = row['cleantext'].split()
-        for word in words:
-            if word.lower() in slave:
-                return 0
-            if word.lower() in freed:
-                return 1
-            if word.lower() in free:
-                return 2
-    return -1
-
-
-def add_status(edcs):
+    filia = ['filia', 'filiae', 'filiai', 'filiam', 'filiad', 'filiarum',
+             'filiabus', 'filias']
+    filius = ['filius', 'fili', 'filii', 'filio', 'filium', 'filiom',
+              'filiorum', 'filios']
+    serva = ['serva', 'servae', 'servam', 'servarum', 'servabus', 'servas',
+             'servai']  # without 'servis'
+    servus = ['servus', 'servi', 'servo', 'servum', 'serve', 'servorum',
+              'servos', 'servom']  # without 'servis'
+    categories = {
+        'legal_status': {**dict.fromkeys(slave, 0), **dict.fromkeys(freed, 1),
+                         **dict.fromkeys(free, 2)},
+        'gender_filix': {**dict.fromkeys(filia, 1),
+                         **dict.fromkeys(filius, 0)},
+        'gender_servx': {**dict.fromkeys(serva, 1),
+                         **dict.fromkeys(servus, 0)}}
+    first = first_match(text, categories)
+    for column in ['legal_status', 'gender_filix']:
+        first[column] = first[column].fillna(-1).astype(int)
+    return first
+
+
+def add_status(edcs, first):
     text = edcs['cleantext']
 
     slave = r'\bserv(?:us|i|o|um|om|orum|is|os|a|ae|ai|am|arum|as|abus)\b'
-    edcs['slave'] = np.where(text.str.contains(slave, regex=True), 1, 0)
+    edcs['slave'] = np.where(text.str.contains(slave, regex=True, na=False),
+                             1, 0)
 
     # without libertas
     lib = r'\blibert(?:us|i|o|um|om|e|orum|is|os|a|ae|ai|am|ad|arum|abus)\b'
-    edcs['freed'] = np.where(text.str.contains(lib, regex=True), 1, 0)
+    edcs['freed'] = np.where(text.str.contains(lib, regex=True, na=False),
+                             1, 0)
 
     free = r'\bfili(?:us|i|o|um|om|orum|is|os|a|ae|ai|am|ad|arum|abus|as)\b'
-    edcs['freeborn'] = np.where(text.str.contains(free, regex=True), 1, 0)
+    edcs['freeborn'] = np.where(text.str.contains(free, regex=True, na=False),
+                                1, 0)
 
-    edcs['legal_status'] = edcs.apply(lambda row: get_legal_status(row), axis=1)
+    # the first status word decides, not the flags above (they may overlap)
+    edcs['legal_status'] = first['legal_status']
     return edcs
 
 
 def no_tags(elem):
     """
     Takes in a string.
-    Searches for opening angle bracket ("<"). If none is found, returns string.
-    If brackets are found, searches for corresponding closing bracket,
-    removes everything in between (=tag), and starts again.
+    Removes all html-tags (everything between angle brackets) in one pass.
     Returns string without tags.
     """
-    opening = elem.find("<")
-    while opening != -1:
-        closing = elem.find(">")
-        remove = elem[opening:closing + 1]
-        elem = elem.replace(remove, "")
-        opening = elem.find("<")
-    return elem
+    return TAGS.sub("", elem)
 
 
-def get_name_set():
+def get_name_set(cache='PIR_name_set.pkl', max_age=timedelta(days=7)):
     """
-    Returns a set of all names from the Prosopographia Imperii Romani database.
-    Opens PIR database and creates a name_set with common abbreviated names.
-    Each name in the PIR database is cleaned up and added to the name_set.
+    Returns a frozenset of all names from the Prosopographia Imperii Romani.
+    If a pickled name_set younger than max_age exists, loads and returns it.
+    Else opens PIR database and creates a name_set with common abbreviated
+    names. Each name in the PIR database is cleaned up and added to the
+    name_set, which is pickled for the next runs.
     Returns name_set.
     """
+    if os.path.exists(cache) and datetime.now() - \
+            datetime.fromtimestamp(os.path.getmtime(cache)) < max_age:
+        with open(cache, 'rb') as f:
+            return pickle.load(f)
     url = 'https://github.com/telota/PIR/raw/public/data/' \
           'pir_export_2021-05-07.csv'
     pir = pd.read_csv(url)
@@ -124,92 +184,86 @@ def get_name_set():
         for part in parts:
             if part[-1] != "." and part[0].isupper() and len(part) > 3:
                 name_set.add(part)
+    name_set = frozenset(name_set)
+    with open(cache, 'wb') as f:
+        pickle.dump(name_set, f)
     return name_set
 
 
-def get_name(row, name_set):
+def get_name(text, name_set):
     """
-    Takes in a series (=row) of a pandas dataframe containing one inscription
-    and the list of all names in the PIR.
-    For each word in the cleantext which is sufficiently long, starts with a
-    capital letter, and is not in the non_names list, the word is converted
-    to its nominative case, and then looked up in the word list.
-    Each match is attached to a string, which is finally returned.
+    Takes in the cleantext column of the EDCS and the set of all names in the
+    PIR.
+    Splits all inscriptions into one long series of words. Each word which
+    is sufficiently long, starts with a capital letter, and is not in the
+    non_names list is converted to its nominative case, and then looked up
+    in the name set; words with Greek / non-Latin letters are skipped.
+    Returns a series with the matches of each inscription joined to a string.
+    """
+    non_names = ["Dis", "Manibus"]
+    words = text.str.split().explode().dropna()
+    words = words[words.map(str.isascii)]
+    candidate = (words.str.len() > 2) & words.str.match(r'[A-Z][a-z]') & \
+        ~words.isin(non_names)
+    nominative = np.select(
+        [candidate & words.str.endswith('ae'),
+         candidate & words.str.endswith(('i', 'o'))],
+        [words.str[:-1], words.str[:-1] + 'us'], default=words)
+    words = pd.Series(nominative, index=words.index, dtype=object)
+    names = words[words.isin(name_set)].groupby(level=0).agg(', '.join)
+    return names.reindex(text.index, fill_value='')
+
+
+def get_gender_person(edcs):
+    """
+    Takes in the EDCS dataframe containing the names of each inscription.
+    Splits all names into one long series and marks each name as most likely
+    male ("-us") or female ("-a"); counts the male and female names of each
+    inscription, and if the ratio between them is sufficiently clear,
+    assigns probable gender (0=male, 1=female, -1=unclear or no name).
+    Returns a series with the gender of each inscription.
     """
-    names = ""
-    words = row['cleantext']
-    if isinstance(words, str):
-        words = row['cleantext'].split()
-        non_names = ["Dis", "Manibus"]
-        for word in words:
-            try:
-                word.encode('ascii')
-            except UnicodeEncodeError:  # contains Greek / non-Latin letters
-                continue
-            if len(word) > 2 and word[0].isupper() and word[1].islower() and \
-                    word not in non_names:
-                if word[-2:] == "ae":
-                    word = word[:-1]
-                elif word[-1] == "i" or word[-1] == "o":
-                    word = word[:-1] + "us"
-            if word in name_set:
-                names += word + ", "
-        if "," in names:
-            names = names[:-2]
-    return names
-
-
-def get_gender_person(row):
-    """
-    Takes in a series (=row) of a pandas dataframe containing one inscription.
-    If row does not contain a name, returns -1.
-    Else, it loops over all names, looking if they are most likely male ("-us")
-    or female ("-a"), and if the ratio between male and female names is
-    sufficiently clear, returns probable gender (0=male, 1=female, 2=unclear).
-    """
-    if row['contains_name'] == 0:
-        return -1
-    male = 0
-    female = 0
     male_names = {"Agrippa", "Aquila", "Caracalla", "Nerva", "Scaevola",
                   "Seneca"}
-    male_suffix = {"us"}
-    names = row['name'].split()
-    for name in names:
-        name = name.replace(",", "").strip()
-        if name[-2:] in male_suffix or name in male_names or \
-                (name[-2:] == "is" and name[-5:] != "ensis"):
-            male += 1
-        elif (name[-1] == "a" or name[-2:] == "oe") and name not in male_names:
-            female += 1
-    if male > 0 and female == 0:
-        return 0
-    elif male == 0 and female > 0:
-        return 1
-    elif male == 0 and female == 0:
-        return -1
-    else:
-        if male / female >= 2:
-            return 0
-        elif female / male >= 2:
-            return 1
-        else:
-            return -1
+    names = edcs['name'].str.split().explode().dropna()
+    names = names.str.replace(",", "").str.strip()
+    known = names.isin(male_names)
+    male = names.str.endswith('us') | known | \
+        (names.str.endswith('is') & ~names.str.endswith('ensis'))
+    female = ~male & (names.str.endswith('a') | names.str.endswith('oe'))
+    counts = pd.DataFrame({'male': male, 'female': female}).astype(int)
+    counts = counts.groupby(level=0).sum()
+    counts = counts.reindex(edcs.index, fill_value=0)
+    male, female = counts['male'], counts['female']
+    gender = np.select([edcs['contains_name'] == 0,
+                        (male > 0) & (male >= 2 * female),
+                        (female > 0) & (female >= 2 * male)],
+                       [-1, 0, 1], default=-1)
+    return pd.Series(gender, index=edcs.index)
 
 
-def get_gender_keywords(row):
-    if row['m'] == 1 and row['f'] == 0:
-        return 0
-    elif row['f'] == 1 and row['m'] == 0:
-        return 1
-    else:
-        return -1
+def get_gender_keywords(edcs):
+    return np.select([(edcs['m'] == 1) & (edcs['f'] == 0),
+                      (edcs['f'] == 1) & (edcs['m'] == 0)], [0, 1], default=-1)
 
 
-def gender_firstword(row):
+def parallel_map(func, series, chunksize=10000):
+    """
+    Applies a function to each element of a pandas series on all cores.
+    Takes in a module-level function and a pandas series.
+    Sends the elements to a pool of worker processes in large chunks, so that
+    the Python-level work on independent rows runs in parallel.
+    Returns a series with the results, keeping the index of the input.
+    """
+    with ProcessPoolExecutor() as executor:
+        result = list(executor.map(func, series, chunksize=chunksize))
+    return pd.Series(result, index=series.index)
+
+
+def gender_firstword(text):
     """
     Returns the gender of the first capitalised word of the cleantext.
-    Takes in a row of the EDCS. Looks at each Capitalised word.
+    Takes in the cleantext of an inscription. Looks at each Capitalised word.
     If Word can be assigned a gender, returns gender (0=male, 1=female).
     If no such words, returns -1.
     """
@@ -217,13 +271,10 @@ def gender_firstword(row):
     male_names = {"Agrippa", "Aquila", "Caracalla", "Nerva", "Scaevola",
                   "Seneca"}
     male_suffix = {"us", "os", "is", "er", "i", "o"}
-    words = row['cleantext']
-    if isinstance(words, str):
-        words = row['cleantext'].split()
+    if isinstance(text, str):
+        words = text.split()
         for word in words:
-            try:
-                word.encode('ascii')
-            except UnicodeEncodeError:  # contains Greek / non-Latin letters
+            if not word.isascii():  # contains Greek / non-Latin letters
                 continue
             if len(word) > 2 and word[0].isupper() and \
                     word[1].islower() and word not in non_names:
@@ -235,35 +286,28 @@ def gender_firstword(row):
     return -1
 
 
-def get_gender_ensis(row):
+def get_gender_ensis(text):
     """
-    Takes in a row of a pandas dataframe.
-    Loops over cleantext, looking for words indicating origin (e.g.'-ensis').
+    Takes in the cleantext of an inscription.
+    Searches cleantext for the first word indicating origin (e.g.'-ensis').
     If found, searches from that word backwards for a name.
     If found, assigns & returns gender on the basis of that name.
     If either not found, returns -1.
     """
-    if not isinstance(row['cleantext'], str):
+    if not isinstance(text, str):
         return -1
 
     start = None
     name = ""
-    words = row['cleantext'].split()
-    locs = r'\b\w*ens(?:is|i|em|e|es|ium|ia|ibus)\b|' \
-           r'\b\w*itan(?:us|i|o|um|a|ae|am|is|os|as|orum|arum)\b|' \
-           r'\b\w*an(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-           r'\b\w*ian(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b' \
-           r'\b\w*gn(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-           r'\btrib(?:us|ui|um|u|uum|ibus)\b|' \
-           r'\bciv(?:is|i|em|e|es|ium|ibus)\b|' \
-           r'\bdomo\b|\borigo\b|\bnatione\b|' \
-           r'\bcoloni(?:a|ae|am|arum|is|as)\b'
-
-    for idx, word in enumerate(words):
-        match = re.search(locs, word)
-        if match:
-            start = idx
-            break
+    words = text.split()
+    # search the whole text once; the match lies in the word after all
+    # complete words preceding it
+    match = LOCS.search(text)
+    if match:
+        before = text[:match.start()]
+        start = len(before.split())
+        if before and not before[-1].isspace():
+            start -= 1
 
     if start is not None:
         non_names = {"Dis", "Manibus"}
@@ -284,83 +328,37 @@ def get_gender_ensis(row):
     return -1
 
 
-def get_filix(row):
-    """
-    Assigns the gender of an inscription based on filiation.
-    Takes in a row of a pandas dataframe.
-    Loops over each word of the inscription text ("cleantext"), searching if
-    a filiation can be found. If yes, determines gender accordingly and
-    returns 0 for male and 1 for female forms.
-    """
-    female = ['filia', 'filiae', 'filiai', 'filiam', 'filiad', 'filiarum',
-              'filiabus', 'filias']
-    male = ['filius', 'fili', 'filii', 'filio', 'filium', 'filiom', 'filiorum',
-            'filios']
-    if not isinstance(row['cleantext'], str):
-        return -1
-    words = row['cleantext'].split()
-    for word in words:
-        if word.lower() in female:
-            return 1
-        elif word.lower() in male:
-            return 0
-    return -1
-
-
-def get_servx(row):
-    """
-    Assigns the gender of an inscription based on servile indicator.
-    Takes in a row of a pandas dataframe.
-    Loops over each word of the inscription text ("cleantext"), searching if a
-    servile indicator can be found. If yes, determines gender accordingly and
-    returns 0 for male and 1 for female forms.
-    """
-    female = ['serva', 'servae', 'servam', 'servarum', 'servabus', 'servas',
-              'servai']  # without 'servis'
-    male = ['servus', 'servi', 'servo', 'servum', 'serve', 'servorum', 'servos',
-            'servom']  # without 'servis'
-    if not isinstance(row['cleantext'], str):
-        return None
-    words = row['cleantext'].split()
-    for word in words:
-        if word.lower() in female:
-            return 1
-        elif word.lower() in male:
-            return 0
-    return -1
-
-
-def add_gender(edcs):
+def add_gender(edcs, first):
     """
     Determines the gender of the dedicatee of each inscription.
-    Takes in the EDCS database; assigns each inscription a gender using
-    different methods.
+    Takes in the EDCS database and the first indicative words of each
+    inscription; assigns each inscription a gender using different methods.
     Returns EDCS with added gender metadata.
     """
     name_set = get_name_set()
-    edcs['name'] = edcs.apply(lambda row: get_name(row, name_set), axis=1)
+    edcs['name'] = get_name(edcs['cleantext'], name_set)
     edcs['contains_name'] = np.where(edcs['name'].str.len() > 2, 1, 0)
 
-    edcs['gender_main_pers'] = edcs.apply(lambda row: get_gender_person(row),
-                                          axis=1)
-    edcs['viri'] = np.where(edcs['keywords'].str.contains('vir'), 1, 0)
-    edcs['mulieres'] = np.where(edcs['keywords'].str.contains('mulier'), 1, 0)
+    edcs['gender_main_pers'] = get_gender_person(edcs)
+    edcs['viri'] = np.where(edcs['keywords'].str.contains('vir', na=False),
+                            1, 0)
+    edcs['mulieres'] = np.where(edcs['keywords'].str.contains('mulier',
+                                                              na=False), 1, 0)
     edcs['m'] = np.where((edcs['viri'] == 1) |
                          (edcs['gender_main_pers'] == 0), 1, 0)
     edcs['f'] = np.where((edcs['mulieres'] == 1) |
                          (edcs['gender_main_pers'] == 1), 1, 0)
 
-    edcs['gender_keywords'] = edcs.apply(lambda row: get_gender_keywords(row),
-                                         axis=1)
-    edcs['gender_of_1st_Word'] = edcs.apply(lambda row: gender_firstword(row),
-                                            axis=1)
-    edcs['gender_ensis'] = edcs.apply(lambda row: get_gender_ensis(row), axis=1)
-    edcs['gender_filix'] = edcs.apply(lambda row: get_filix(row), axis=1)
-    edcs['gender_servx'] = edcs.apply(lambda row: get_servx(row), axis=1)
+    edcs['gender_keywords'] = get_gender_keywords(edcs)
+    edcs['gender_of_1st_Word'] = parallel_map(gender_firstword,
+                                              edcs['cleantext'])
+    edcs['gender_ensis'] = parallel_map(get_gender_ensis, edcs['cleantext'])
+    edcs['gender_filix'] = first['gender_filix']
+    edcs['gender_servx'] = first['gender_servx']
     return edcs
 
 
-def assign_gender(row):
+def assign_gender(edcs):
     """
     Assigns gender of inscription based on gender-determining tests.
     For each row in the EDCS, checks if any of the good tests found a gender.
@@ -368,14 +366,10 @@ def assign_gender(row):
     ca. 94%, filix and servx together in ca. 90%, and the first capitalised
     word in ca. 83% of all cases), returns gender of inscription.
     """
-    if row['gender_keywords'] == 0 or row['gender_filix'] == 0 or \
-            row['gender_servx'] == 0 or row['gender_of_1st_Word'] == 0:
-        return 'm'
-    elif row['gender_keywords'] == 1 or row['gender_filix'] == 1 or \
-            row['gender_servx'] == 1 or row['gender_of_1st_Word'] == 1:
-        return 'f'
-    else:
-        return None
+    tests = edcs[['gender_keywords', 'gender_filix', 'gender_servx',
+                  'gender_of_1st_Word']]
+    return np.select([(tests == 0).any(axis=1), (tests == 1).any(axis=1)],
+                     ['m', 'f'], default=None)
 
 
 def add_metadata(edcs):
@@ -383,77 +377,58 @@ def add_metadata(edcs):
     Adds gender, social & legal status, funerary and migrant metadata to edcs.
     Returns EDCS containing metadata.
     """
-    edcs = add_gender(edcs)
-    edcs['gender'] = edcs.apply(lambda row: assign_gender(row), axis=1)
-
-    edcs = add_status(edcs)
+    # Python-backed strings: Arrow's str.contains uses RE2, whose \b and \w
+    # are ASCII-only and would split words at accented or Greek letters
+    edcs = edcs.astype({'cleantext': 'string[python]',
+                        'keywords': 'string[python]'})
+    # lowercase the texts once for all case-insensitive lookups
+    edcs['cleantext_lc'] = edcs['cleantext'].str.lower()
+    first = get_first_words(edcs['cleantext_lc'])
+    edcs = add_gender(edcs, first)
+    edcs['gender'] = assign_gender(edcs)
+
+    edcs = add_status(edcs, first)
     edcs['text_length'] = edcs['cleantext'].str.len()
 
-    text = edcs['cleantext'].str.lower()
+    text = edcs['cleantext_lc']
     regex = r'faciend(?:[a-z]+) curav(?:[a-z]+)|dis manibus|' \
             r'sit(?:[a-z]+) est|bene merenti|vixit|ex testamento|' \
             r'sit tibi terra levis|requiesc[a-z]t'
-    edcs['funerary'] = np.where(edcs['keywords'].str.contains("sepulcrales") |
-                                text.str.contains(regex, regex=True),
+    edcs['funerary'] = np.where(edcs['keywords'].str.contains("sepulcrales",
+                                                              na=False) |
+                                text.str.contains(regex, regex=True, na=False),
                                 1, 0)
 
-    # \b word boundary, \w* one or more word chars, (?:x|y)\b ends in x or y
-    locs = r'\b\w*ens(?:is|i|em|e|es|ium|ia|ibus)\b|' \
-           r'\b\w*itan(?:us|i|o|um|a|ae|am|is|os|as|orum|arum)\b|' \
-           r'\b\w*an(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-           r'\b\w*ian(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b' \
-           r'\b\w*gn(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-           r'\btrib(?:us|ui|um|u|uum|ibus)\b|' \
-           r'\bciv(?:is|i|em|e|es|ium|ibus)\b|' \
-           r'\bdomo\b|\borigo\b|\bnatione\b|' \
-           r'\bcoloni(?:a|ae|am|arum|is|as)\b'
-    # r'\b\w*in(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-    # r'\b\w*ic(?:us|i|o|um|a|ae|am|orum|os|is|arum|as)\b|' \
-    edcs['location_indicator'] = np.where(text.str.contains(locs, regex=True),
-                                          1, 0)
+    edcs['location_indicator'] = np.where(text.str.contains(LOCS.pattern,
+                                                            regex=True,
+                                                            na=False), 1, 0)
+    edcs.drop(columns=['cleantext_lc'], inplace=True)
     return edcs
 
 
 def no_brackets(elem):
     """
     Takes in a string.
-    Searches for opening or closing parentheses. If none found, returns string.
-    If found, checks if it is an omission ("(...)"), and if so, removes it;
-    checks if it is an entire word, and if so, removes it;
-    if it is neither (i.e. a spelling variant), creates both readings.
-    Repeats until no more parentheses are found.
+    Removes all omissions ("(...)") and all elements in parentheses which are
+    an entire word in one pass; if parentheses remain (i.e. spelling
+    variants), creates both readings of each word containing them.
     Returns string without all elements in parentheses.
     """
-    opening = elem.find("(")
-    variants = False
-    while opening != -1:
-        closing = elem.find(")", opening)
-        remove = elem[opening:closing + 1]
-        if remove == "(...)":
-            elem = elem.replace(remove, "")
-        elif opening > 0 and elem[opening - 1].isspace():
-            remove = elem[opening:closing + 1]
-            elem = elem.replace(remove, "")
-        else:
-            variants = True
-        opening = elem.find("(", opening + 1)
+    elem = OMISSIONS.sub("", elem)
     elem = elem.replace("  ", " ").replace(" ,", ",")
 
-    if variants:
+    if "(" in elem:
         result = []
         words = elem.split(" ")
         for word in words:
-            opening = word.find("(")
-            if opening == -1:
+            variants = VARIANTS.findall(word)
+            if not variants:
                 result.append(word)
-            while opening != -1:
-                closing = word.find(")", opening)
-                variant = word[opening:closing + 1]
+            for variant in variants:
                 word_without = word.replace(variant, "")
                 result.append(word_without)
                 word_with = word.replace("(", "").replace(")", "")
                 result.append(word_with)
-                opening = word.find("(", opening + 1)
         elem = " ".join(result)
     return elem
 
@@ -462,99 +437,103 @@ def get_place_names(pleiades):
     """
     Takes in a pandas dataframe with the Pleiades names database.
     Creates a new column 'placenames'.
-    For each location, removes html-tags, comments in brackets,
-    checks for variants, and adds all variants 'placenames' column.
+    For all ancient locations at once, removes html-tags, comments in
+    brackets, checks for variants, splits lists of names, and adds all
+    distinct variants to the 'placenames' column.
     Returns dataframe.
     """
-    pleiades['placenames'] = None
-    ancient = "HRL"
-    for idx, elem in pleiades.iterrows():
-        relevant = False
-        try:
-            for letter in elem['timePeriods']:
-                if letter in ancient:
-                    relevant = True
-                    break
-        except TypeError:
-            relevant = True
-        if not relevant:
-            continue
-        place_names = set()
-        elem = no_tags(elem['nameTransliterated'])
-        elem = elem.replace("?", "").replace('[', '').replace(']', '')
-        elem = no_brackets(elem)
-        comma = elem.find(",")
-        if comma == -1:
-            place_names.add(elem.replace("  ", " ").strip())
-        else:
-            locs = elem.split(",")
-            for loc in locs:
-                slash = loc.find("/")
-                if slash == -1:
-                    place_names.add(loc.replace("  ", " ").strip())
-                else:
-                    loks = loc.split("/")
-                    for lok in loks:
-                        place_names.add(lok.replace("  ", " ").strip())
-        # remove Castr, Fret and Misen
-        if 'Castr' in place_names:
-            place_names.remove('Castr')
-        if 'Fret' in place_names:
-            place_names.remove('Fret')
-        if 'Misen' in place_names:
-            place_names.remove('Misen')
-        places = ", ".join(place_names)
-        pleiades.at[idx, 'placenames'] = places
+    periods = pleiades['timePeriods']
+    relevant = periods.isna() | periods.str.contains('[HRL]', regex=True,
+                                                     na=True)
+    elem = pleiades.loc[relevant, 'nameTransliterated'].str.replace(
+        TAGS, "", regex=True)
+    elem = elem.str.replace("?", "").str.replace('[', '').str.replace(']', '')
+    elem = elem.map(no_brackets)
+    # lists of names are split at commas, and then also at slashes
+    has_comma = elem.str.contains(",", regex=False)
+    elem = elem.where(~has_comma, elem.str.replace("/", ","))
+    names = elem.str.split(",").explode()
+    names = names.str.replace("  ", " ").str.strip()
+    # remove Castr, Fret and Misen
+    names = names[~names.isin(['Castr', 'Fret', 'Misen'])]
+    names = names.groupby(level=0, sort=False).unique().str.join(", ")
+    places = names.reindex(elem.index, fill_value="")
+    pleiades['placenames'] = places.reindex(pleiades.index).astype(object)
+    pleiades['placenames'] = pleiades['placenames'].where(relevant, None)
     print("Added column with placenames to Pleiades database.")
     return pleiades
 
 
-def add_coordinates(pleiades):
+def fetch_coordinates(session, pid):
+    """
+    Downloads the gps coordinates of a place from the Pleiades API.
+    Takes in a requests session and the Pleiades ID (path) of the place.
+    Raises a requests error for any unsuccessful response (after the
+    session's retries), so that it is not mistaken for a broken JSON file.
+    Returns a tuple of latitude and longitude, or None if the JSON file
+    contains no point coordinates.
+    """
+    base_url = "https://pleiades.stoa.org"
+    response = session.get(base_url + pid + "/json", timeout=60)
+    response.raise_for_status()
+    data = response.json()
+    if 'reprPoint' in data.keys() and data['reprPoint']:
+        return data['reprPoint'][1], data['reprPoint'][0]
+    elif 'features' in data.keys() and data['features'] and \
+            'geometry' in data['features'][0].keys() and \
+            data['features'][0]['geometry'] is not None and \
+            'type' in data['features'][0]['geometry'].keys() and \
+            data['features'][0]['geometry']['type'] == 'Point':
+        coordinates = data['features'][0]['geometry']['coordinates']
+        return coordinates[1], coordinates[0]
+    return None
+
+
+def add_coordinates(pleiades, workers=8):
     """
     Adds missing gps coordinates to the pleiades dump file.
     Takes in a pandas dataframe containing the Pleiades names database.
-    Iterates over all rows, checking if row contains coordinates.
-    If not, connects to the Pleiades API, downloads and adds them.
-    Because there are some errors in the JSON files, the whole is wrapped
-    in a try-except block and prints the index of all rows causing errors.
-    Returns the thus modified dataframe.
+    Checks which rows contain no coordinates, and downloads them from the
+    Pleiades API, using a small pool of threads sharing one connection pool,
+    which retries throttled or failed requests with an increasing delay.
+    Because there are some errors in the JSON files, and some requests fail
+    even after retrying, each download is wrapped in a try-except block and
+    the index of all rows causing errors is saved.
+    Writes all found coordinates to the dataframe at once and returns it.
     """
     # improved gps coordinate availability by some 16%.
-    base_url = "https://pleiades.stoa.org"
-    fixed = 0
+    missing = pleiades[pleiades['reprLatLong'].map(
+        lambda elem: isinstance(elem, float))]
+    fixed = {}
     errors = []
-    for idx, elem in pleiades.iterrows():
-        if idx != 0 and idx % 100 == 0:
-            print(f"Checked {idx} entries in database",
-                  f"(ca. {round(100 / len(pleiades) * idx, 2)}%).",
-                  f"Fixed {fixed} entries so far.")
-        if isinstance(elem['reprLatLong'], float):
+    with requests.Session() as session, \
+            ThreadPoolExecutor(max_workers=workers) as executor:
+        retry = urllib3.util.Retry(total=5, backoff_factor=1,
+                                   status_forcelist=[429, 500, 502, 503, 504])
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers,
+                                                max_retries=retry)
+        session.mount("https://", adapter)
+        futures = {idx: executor.submit(fetch_coordinates, session, pid)
+                   for idx, pid in missing['pid'].items()}
+        for count, (idx, future) in enumerate(futures.items()):
+            if count != 0 and count % 100 == 0:
+                print(f"Checked {count} entries in database",
+                      f"(ca. {round(100 / len(futures) * count, 2)}%).",
+                      f"Fixed {len(fixed)} entries so far.")
             try:
-                url = base_url + elem['pid'] + "/json"
-                response = requests.get(url)
-                data = response.json()
-                if 'reprPoint' in data.keys() and data['reprPoint']:
-                    long = data['reprPoint'][0]
-                    lat = data['reprPoint'][1]
-                elif 'features' in data.keys() and data['features'] and \
-                        'geometry' in data['features'][0].keys() and \
-                        data['features'][0]['geometry'] is not None and \
-                        'type' in data['features'][0]['geometry'].keys() and \
-                        data['features'][0]['geometry']['type'] == 'Point':
-                    coordinates = data['features'][0]['geometry']['coordinates']
-                    long = coordinates[0]
-                    lat = coordinates[1]
-                else:
-                    continue
-                pleiades.at[idx, 'reprLat'] = lat
-                pleiades.at[idx, 'reprLong'] = long
-                pleiades.at[idx, 'reprLatLong'] = str(lat) + "," + str(long)
-                fixed += 1
+                coordinates = future.result()
             except (TypeError, ValueError,
-                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.RequestException,
                     urllib3.exceptions.ProtocolError,
                     urllib3.exceptions.InvalidChunkLength):
-                errors.append(f"{idx}, {elem['pid']}")
+                errors.append(f"{idx}, {missing.at[idx, 'pid']}")
+                continue
+            if coordinates is not None:
+                lat, long = coordinates
+                fixed[idx] = (lat, long, str(lat) + "," + str(long))
+    fixed = pd.DataFrame.from_dict(
+        fixed, orient='index', columns=['reprLat', 'reprLong', 'reprLatLong'])
+    pleiades.loc[fixed.index, fixed.columns] = fixed
     with open('pleiades_coordinates_errors.txt', 'w', encoding='utf-8') as f:
         for elem in errors:
             f.write(str(elem) + '\n')
@@ -562,103 +541,100 @@ def add_coordinates(pleiades):
     return pleiades
 
 
-def add_stem(row):
+def add_stem(pleiades):
     """
     Creates toponym-ready stems for each place in the Pleiades database.
-    Takes in a row of the Pleiades database.
-    Loops over the 'placenames' column, and if there is a placename,
-    splits it at spaces. Loops backward over each such word until first vowel,
-    and copies the stem into a list. If last letter of stem is a vowel,
-    goes back one letter to create toponym-stem until a consonant is reached.
-    Joins toponym-stem-list to a string, and returns it.
-    """
-    if row['placenames'] is None:
-        return None
-    vowels = "aeiou"
-    stem_list = []
-    locations = row['placenames'].split()
-    for location in locations:
-        for index, letter in enumerate(reversed(location)):
-            if letter in vowels:
-                i = len(location) - index - 1
-                if i <= 2:
-                    break
-                else:
-                    stem_list.append(location[:i])
-                    while location[i - 1] in vowels:
-                        stem_list.append(location[:i - 1])
-                        i -= 1
-                    break
-    stems = ", ".join(stem_list)
-    return stems
+    Takes in the Pleiades database.
+    Splits all placenames into words, and finds the last run of vowels of each
+    word with a regex; the word up to its last vowel is the stem. If the
+    letters before it are vowels, too, adds a stem without each of them until
+    a consonant is reached. Words whose last vowel is among the first three
+    letters have no stem.
+    Returns a series with the joined toponym-stems of each place.
+    """
+    placenames = pleiades['placenames']
+    words = placenames.str.split().explode().dropna()
+    parts = words.str.extract(r'^(?P<base>.*?)(?P<run>[aeiou]+)[^aeiou]*$')
+    parts = parts.dropna(subset=['run'])
+    length = parts['run'].str.len().to_numpy(dtype=int)
+    keep = parts['base'].str.len().to_numpy(dtype=int) + length > 3
+    parts, length = parts[keep], length[keep]
+    # one stem for each letter of the vowel run, cutting it from the end
+    repeat = np.repeat(np.arange(len(parts)), length)
+    cut = np.arange(len(repeat)) - np.repeat(np.cumsum(length) - length,
+                                             length) + 1
+    parts = parts.iloc[repeat]
+    stems = [base + run[:len(run) - c] for base, run, c in
+             zip(parts['base'], parts['run'], cut)]
+    stems = pd.Series(stems, index=parts.index, dtype=object)
+    stems = stems.groupby(level=0, sort=False).agg(", ".join)
+    stems = stems.reindex(placenames.index, fill_value="").astype(object)
+    return stems.where(placenames.map(lambda elem: isinstance(elem, str)),
+                       None)
 
 
 def find_migrants(edcs, pleiades):
     """
     Finds possible migrants in EDCS database based on Pleiades names.
     Takes in two dataframes: the EDCS and the modified Pleiades database.
-    Creates a dataframe for migrants with same columns as EDCS.
-    Loops over toponyms, and for each toponym, loops over the EDCS, searching
-    if there is a match within the inscription text.
-    If match is found, the respective line from the EDCS is copied to the
+    Extracts all words like 'Emeritensis' from the EDCS together with their
+    stem, and joins them with the toponym stems of the Pleiades database.
+    For each match, the respective line from the EDCS is copied to the
     migrants database, and toponym, GPS coordinates, and Pleiades ID is added.
-    Once all toponyms have been searched for in all inscriptions,
-    returns migrants database.
+    Returns migrants database.
     """
     today = datetime.today()
     edcs.rename(columns={'edcs-id': 'edcs_id'}, inplace=True)
     edcs = edcs[edcs['funerary'] == 1]
-    column_names = edcs.columns.values.tolist()
-    migrants = pd.DataFrame(columns=column_names)
-    r = 0
-    found = 0
-    length = len(pleiades)
     # remove Castrensis, Misenensis and Fretensis from stems
     pleiades['stem'] = pleiades['stem'].str.replace('Castr', '')
     pleiades['stem'] = pleiades['stem'].str.replace('Misen', '')
     pleiades['stem'] = pleiades['stem'].str.replace('Fret', '')
-    # loop over Pleiades database, looking at each toponym stem
-    for row in pleiades.itertuples():
-        idx = row.Index
-        if idx > 0 and idx % 10 == 0:
-            print(f"Searched {idx} toponyms " +
-                  f"(ca. {round(100 / length * idx, 2)}%). " +
-                  f"Found {found} possible migrants so far.")
-        # if there is no stem, continue to next row
-        if not isinstance(row.stem, str):
-            continue
-        stems = [stem.strip() for stem in row.stem.split(",")]
-        # search for words like 'Emeritensis', 'Coritanus', etc.
-        for stem in stems:
-            for insc in edcs.itertuples():
-                if isinstance(insc.cleantext, float):
-                    continue
-                matches = []
-                loc = r'\b{}ens(?:is|i|em|e|es|ium|ia|ibus)\b'.format(stem)
-                for match in re.findall(loc, insc.cleantext):
-                    matches.append(match)
-                # if toponym is found, copy inscription to migrants database
-                if matches:
-                    migrants = pd.concat([migrants, pd.DataFrame([insc])], ignore_index=True)
-                    # migrants = migrants.append(pd.DataFrame([row], columns=row._fields), ignore_index=True)
-                    # migrants = pd.concat([migrants, insc],
-                                          # pd.DataFrame(edcs.iloc[i]).T],
-                                         # ignore_index=True)
-                    migrants.at[r, 'origo'] = row.title
-                    migrants.at[r, 'toponym'] = ",".join(matches)
-                    migrants.at[r, 'origo_lat'] = row.reprLat
-                    migrants.at[r, 'origo_long'] = row.reprLong
-                    migrants.at[r, 'origo_LatLong'] = row.reprLatLong
-                    migrants.at[r, 'path'] = row.path
-                    migrants.at[r, 'pid'] = row.pid
-                    migrants.at[r, 'pleiades'] = 1
-                    if isinstance(migrants['origo_LatLong'].iloc[r], str) and \
-                            len(migrants['origo_LatLong'].iloc[r]) >= 1:
-                        migrants.at[r, 'located'] = 1
-                    else:
-                        migrants.at[r, 'located'] = 0
-                    r += 1
-                    found += 1
+    # one row per toponym stem, in the order of the Pleiades database
+    stems = pleiades['stem'].reset_index(drop=True).str.split(",").explode()
+    stems = stems.dropna().str.strip()
+    stems = pd.DataFrame({'pleiades_row': stems.index,
+                          'stem': stems.to_numpy(dtype=object)})
+    plain = stems['stem'].str.fullmatch(r'\w*')
+
+    # search for words like 'Emeritensis', and join them by stem
+    text = edcs['cleantext'].reset_index(drop=True)
+    text = text[text.map(lambda elem: isinstance(elem, str))]
+    ensis = r'(?P<toponym>\b(?P<stem>\w*)ens(?:is|i|em|e|es|ium|ia|ibus)\b)'
+    words = text.str.extractall(ensis)
+    words.index.names = ['edcs_row', 'match']
+    words['stem'] = words['stem'].fillna('')
+    words = words.reset_index().groupby(['edcs_row', 'stem'], sort=False)
+    words = words['toponym'].agg(",".join).reset_index()
+    hits = [stems[plain].reset_index(names='order')
+            .merge(words, on='stem', how='inner')]
+    # stems with other characters are searched for directly
+    for order, stem in stems.loc[~plain, 'stem'].items():
+        loc = r'\b{}ens(?:is|i|em|e|es|ium|ia|ibus)\b'.format(stem)
+        matches = text.str.findall(loc)
+        matches = matches[matches.str.len() > 0]
+        hits.append(pd.DataFrame({'order': order,
+                                  'pleiades_row': stems.at[order,
+                                                           'pleiades_row'],
+                                  'edcs_row': matches.index,
+                                  'toponym': matches.str.join(",")}))
+    hits = pd.concat(hits, ignore_index=True)
+    hits = hits.sort_values(['order', 'edcs_row'], kind='stable')
+
+    # copy matching inscriptions and add the origo of each
+    migrants = edcs.iloc[hits['edcs_row']].reset_index(names='Index')
+    migrants = migrants[edcs.columns.tolist() + ['Index']]
+    origo = pleiades.iloc[hits['pleiades_row']]
+    migrants['origo'] = origo['title'].to_numpy()
+    migrants['toponym'] = hits['toponym'].to_numpy()
+    migrants['origo_lat'] = origo['reprLat'].to_numpy()
+    migrants['origo_long'] = origo['reprLong'].to_numpy()
+    migrants['origo_LatLong'] = origo['reprLatLong'].to_numpy()
+    migrants['path'] = origo['path'].to_numpy()
+    migrants['pid'] = origo['pid'].to_numpy()
+    migrants['pleiades'] = 1
+    migrants['located'] = migrants['origo_LatLong'].map(
+        lambda elem: isinstance(elem, str) and len(elem) >= 1).astype(int)
     save_database(migrants, today, 'EDCS_Migrants_quick_Raw01')
     migrants.index.name = "Index"
     # remove rows which have identical inscription and origo
@@ -677,13 +653,15 @@ def remove_nonmigrants(migrants):
     Returns modified dataframe.
     """
     # delete the lowercase-match-migrants (mostly 'menses' and 'castrensis')
+    # Python-backed strings, so that \b also knows non-ASCII letters
+    migrants['toponym'] = migrants['toponym'].astype('string[python]')
     regex = r'\b(?:[a-z]+)\b'
-    delete = migrants['toponym'].str.contains(regex)
+    delete = migrants['toponym'].str.contains(regex, na=False)
     migrants = migrants[~delete]
 
     # delete the 'Mense'- and 'Mensibus'-migrants
     pattern = r'\bMens(?:[a-z]+)\b'
-    remove = migrants['toponym'].str.contains(pattern)
+    remove = migrants['toponym'].str.contains(pattern, na=False)
     migrants = migrants[~remove]
     return migrants
 
@@ -696,20 +674,26 @@ def round_distances(migrants):
     return migrants
 
 
-def add_distance(row):
+def add_distance(migrants):
     """
     Adds the distance between findspot and origo to Migrants database.
-    Takes in a dataframe row. If 'origo_LatLong' contains coordinates,
-    calculates the distance between origo and findspot and returns it if > 10km.
-    If 'origo_LatLong' doesn't contain coordinates, returns NaN.
-    """
-    if isinstance(row['origo_LatLong'], str):
-        findspot = (row['find_lat'], row['find_long'])
-        origo = (row['origo_lat'], row['origo_long'])
-        distance = hs.haversine(findspot, origo)
-        if distance > 10:  # prevent trivial distances and gps precision errors
-            return distance
-    return np.nan
+    Takes in the migrants dataframe. Calculates the great-circle distance
+    between origo and findspot for all rows at once with numpy.
+    Returns the distances, keeping those > 10km of all rows whose
+    'origo_LatLong' contains coordinates, and NaN for all other rows.
+    """
+    find_lat = np.radians(migrants['find_lat'].to_numpy(dtype=float))
+    find_long = np.radians(migrants['find_long'].to_numpy(dtype=float))
+    origo_lat = np.radians(migrants['origo_lat'].to_numpy(dtype=float))
+    origo_long = np.radians(migrants['origo_long'].to_numpy(dtype=float))
+    a = np.sin((origo_lat - find_lat) / 2) ** 2 + \
+        np.cos(find_lat) * np.cos(origo_lat) * \
+        np.sin((origo_long - find_long) / 2) ** 2
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+    located = migrants['origo_LatLong'].map(
+        lambda elem: isinstance(elem, str)).to_numpy(dtype=bool)
+    # prevent trivial distances and gps precision errors
+    return np.where(located & (distance > 10), distance, np.nan)
 
 
 def remove_duplicates(migrants):
@@ -718,8 +702,10 @@ def remove_duplicates(migrants):
     Removes all duplicate migrants, keeping the one with the shortest distance.
     Returns dataframe.
     """
-    migrants = migrants.sort_values(by=['edcs_id', 'distance'])
-    migrants = migrants.drop_duplicates(subset=['edcs_id'], keep='first')
+    # rows without distance are only kept if no row of the id has one
+    distance = migrants['distance'].fillna(np.inf)
+    shortest = distance.groupby(migrants['edcs_id'], dropna=False).idxmin()
+    migrants = migrants.loc[shortest]
     print("Removed duplicates.")
     return migrants
 
@@ -735,7 +721,7 @@ def add_details(migrants):
     migrants = remove_nonmigrants(migrants)
     save_database(migrants, today, 'EDCS_Migrants_quick_onlymigrants')
     migrants = round_distances(migrants)
-    migrants['distance'] = migrants.apply(lambda row: add_distance(row), axis=1)
+    migrants['distance'] = add_distance(migrants)
     migrants = remove_duplicates(migrants)
     return migrants
 
@@ -743,37 +729,35 @@ def add_details(migrants):
 def get_master(migrants, edcs):
     """
     Takes in two pandas dataframes containing the migrants and EDCS databases.
-    Creates a deep copy of the migrants database: the new master database.
-    Loops over the EDCS database. Each entry whose EDCS-ID is not already
-    in the master database is added to it.
+    Adds every entry of the EDCS database whose EDCS-ID is not already
+    in the migrants database to it in a single concat: the master database.
     Drops the index, sorts by EDCS-ID and returns master database.
     """
     edcs.rename(columns={'edcs-id': 'edcs_id'}, inplace=True)
-    master = migrants.copy()
-    length_edcs = len(edcs.index)
-    counter = 0
-    for index, insc in edcs.iterrows():
-        if insc['edcs_id'] not in master['edcs_id'].unique():
-            master.at[len(master.index)] = insc
-            counter += 1
-            if counter % 1000 == 0:
-                print(f"Added {counter} inscriptions " +
-                      f"(ca. {round(100 / length_edcs * counter, 2)}%).")
-
-    master.drop('Index', axis=1, inplace=True)
-    master.sort_values(by='edcs-id', inplace=True)
+    new = edcs[~edcs['edcs_id'].isin(migrants['edcs_id'].to_numpy())]
+    new = new.drop_duplicates(subset=['edcs_id'], keep='first')
+    master = pd.concat([migrants, new], ignore_index=True)
+    print(f"Added {len(new.index)} inscriptions.")
+
+    master.drop('Index', axis=1, inplace=True, errors='ignore')
+    master.sort_values(by='edcs_id', inplace=True)
     print("Finished EDCS master database.")
     return master
 
 
 def quick_master(migrants, edcs):
     edcs.rename(columns={'edcs-id': 'edcs_id'}, inplace=True)
+    edcs = edcs.astype({column: dtype for column, dtype in
+                        CATEGORICAL.items() if column in edcs})
+    # the merge is validated as many-to-one, so keep one migrant per id
+    if not migrants['edcs_id'].is_unique:
+        migrants = migrants.drop_duplicates(subset=['edcs_id'], keep='last')
     # master = pd.merge(edcs, migrants, on='edcs_id', how='outer')
     master = pd.merge(edcs, migrants[['edcs_id', 'origo', 'toponym',
                                       'origo_lat', 'origo_long',
                                       'origo_LatLong', 'path', 'pid',
                                       'pleiades', 'located', 'distance']],
-                      on='edcs_id', how='left')
+                      on='edcs_id', how='left', validate='m:1', sort=False)
     return master
 
 
@@ -786,7 +770,8 @@ def main():
     # edcs = open_database('EDCS_complete_', today)
     # edcs = add_metadata(edcs)
     # save_database(edcs, today, 'EDCS_Metadata')
-    edcs = pd.read_csv('EDCS_Metadata_2023-03-14.csv')
+    edcs = pd.read_csv('EDCS_Metadata_2023-03-14.csv', engine='pyarrow',
+                       dtype=CATEGORICAL)
 
     # pleiades_url = 'https://atlantides.org/downloads/pleiades/dumps/' \
     #                'pleiades-names-latest.csv.gz'
@@ -795,7 +780,7 @@ def main():
     # save_database(pleiades, today, 'Pleiades_coordinates')
     # pleiades = get_place_names(pleiades)
     # save_database(pleiades, today, 'Pleiades_placenames')
-    # pleiades['stem'] = pleiades.apply(lambda row: add_stem(row), axis=1)
+    # pleiades['stem'] = add_stem(pleiades)
     # save_database(pleiades, today, 'Pleiades_complete')
     # pleiades = pd.read_csv('Pleiades_complete_2023-03-15.csv')
 
@@ -805,7 +790,8 @@ def main():
     # migrants = add_details(migrants)
     # save_database(migrants, today, 'EDCS_Migrants_quick')
 
-    migrants = pd.read_csv('EDCS_Migrants_quick_2023-03-16.csv')
+    migrants = pd.read_csv('EDCS_Migrants_quick_2023-03-16.csv',
+                           engine='pyarrow')
     master = quick_master(migrants, edcs)
     # master = get_master(migrants, edcs)
     save_database(master, today, 'EDCS_Master_quick')
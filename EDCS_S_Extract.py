@@ -1,181 +1,125 @@
 import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup as bs
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import bisect
 import csv
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import html
 import string
 import re
-
-
-def missing(text, i):
-    """
-    Checks if there are indicators of missing letters (e.g. "[3]").
-    Takes in an inscription text as a string and an index i.
-    Checks if at this index, the code is dealing with an indication
-    of missing letters (e.g. "[3]" etc.), and if so, returns True.
-    In all other cases, it returns False.
-    """
-    if i < len(text) - 2:
-        if text[i] == '[' and text[i + 1].isnumeric() and text[i + 2] == ']':
-            return True
-        if text[i - 1] == '[' and text[i].isnumeric and text[i + 1] == ']':
-            return True
-        if text[i - 2] == '[' and text[i - 1].isnumeric() and text[i] == ']':
-            return True
-    return False
+import sys
+
+
+# number of days to look back for the most recent version of a file
+MAX_DAYS = 30
+# buffer size in bytes for reading and writing the large EDCS files
+BUFFER_SIZE = 1 << 20
+# markup of the sourcetext: comments (their text is kept verbatim), tags,
+# and comments or tags which are never closed (kept verbatim as text, up to
+# the next '>' or '<', as html.parser does)
+MARKUP = re.compile(r'<!--(?P<comment>.*?)--\s*>|'
+                    r'</?[A-Za-z][^>]*>|'
+                    r'(?P<open><!--[^>]*>|<(?:!--|/?[A-Za-z])[^<]*(?=<))',
+                    re.S)
+# corrected letters ('<e=I>') and superficial letters ('{s}') in EDCS texts
+CORRECTIONS = re.compile(r'<([^=>]*)=[^>]*>')
+SUPERFICIAL = re.compile(r'\{[^}]*\}')
+# numeric characters (as in str.isnumeric), and those of them which are
+# word characters but no letters (e.g. '²', '½', 'Ⅻ')
+NUMERIC = ''.join(char for char in map(chr, range(sys.maxunicode + 1))
+                  if char.isnumeric())
+NUMERALS = ''.join(char for char in NUMERIC if not char.isalpha())
+# letters (exactly str.isalpha), whitespace and missing letters indicators
+# ('[3]') of cleantext, and the mark within other single-character brackets
+# ('[-]' keeps '-')
+CLEAN = re.compile(r'\[[' + re.escape(NUMERIC) + r']\]|(?<=\[).(?=\])|'
+                   r'[^\W_' + re.escape(NUMERALS) + r']+|\s+')
+# everything but the numbers of a dating
+NON_DIGIT = re.compile(r'\D')
+# coordinates in the comment of the findspot
+COORDINATES = re.compile(r'(lat|long)itude=(-?\d+(?:\.\d*)?)')
+# empty inscription dictionary; its keys are the columns of the EDCS database
+INSCRIPTION = {
+    "publication": "n/a",
+    "edcs-id": np.nan,
+    "time_from": np.nan,
+    "time_to": np.nan,
+    "province": "n/a",
+    "findspot": "n/a",
+    "find_lat": np.nan,
+    "find_long": np.nan,
+    "text": "n/a",
+    "cleantext": "n/a",
+    "keywords": "n/a",
+    "material": "n/a",
+    "comment": "n/a",
+}
+COLUMNS = list(INSCRIPTION)
 
 
 def correct_text(text):
     """
     Corrects ancient spelling errors in inscription text.
     Takes in the text of an inscription with corrected letters as a string.
-    Searches for opening and corresponding closing angle brackets (<>),
-    as well as all equal signs, adding them to a list each.
-    For each of these pairs, the square brackets and the incorrect letter
-    are removed from the text, and once all incorrect letters are removed,
-    the cleaned text is returned.
+    Replaces each pair of angle brackets (<>) by the lowercased correct
+    letters before the equal sign, dropping the incorrect letters after it.
+    Returns the cleaned text.
     """
-    corrected = ''
-    opens = text.find("<")
-    opening_list = []
-    equals_list = []
-    closing_list = []
-    while opens != -1 and opens + 1 < len(text):
-        equals = text.find("=", opens)
-        closes = text.find(">", opens)
-        opening_list.append(opens)
-        equals_list.append(equals)
-        closing_list.append(closes)
-        opens = text.find("<", opens + 1)
-
-    closing = 0
-    for i in range(len(opening_list)):
-        for j in range(closing, opening_list[i]):
-            corrected += text[j]
-        closing = closing_list[i] + 1
-        for k in range(opening_list[i] + 1, equals_list[i]):
-            corrected += text[k].lower()
-    for x in range(closing, len(text)):
-        corrected += text[x]
-    return corrected
+    return CORRECTIONS.sub(lambda match: match.group(1).lower(), text)
 
 
 def remove_superficial_letters(text):
     """
     Removes ancient superficial letters from inscription text.
     Takes in the text of an inscription with superficial letters as a string.
-    Searches for opening and matching closing curly braces ({}),
-    adding them to a list each.
-    For each of these pairs, the curly braces and whatever is within them
-    are removed from the text, and once all superficial letters are removed,
-    the cleaned text is returned.
+    Removes each pair of curly braces ({}) and whatever is within them.
+    Returns the cleaned text.
     """
-    result = ''
-    opens = text.find('{')
-    opening_list = []
-    closing_list = []
-    while opens != -1 and opens + 1 < len(text):
-        closes = text.find('}', opens)
-        opening_list.append(opens)
-        closing_list.append(closes)
-        opens = text.find('{', opens + 1)
-
-    closing = 0
-    for i in range(len(opening_list)):
-        for j in range(closing, opening_list[i]):
-            result += text[j]
-        closing = closing_list[i] + 1
-    for k in range(closing, len(text)):
-        result += text[k]
-    return result
+    return SUPERFICIAL.sub('', text)
 
 
 def get_cleantext(text):
     """
     Parses inscription text and returns cleantext.
     Takes in the text of an inscription as a string.
-    Searches for equal signs and curly braces (which indicate edits)
-    and if found, corrects the text and / or removes superficial letters.
-    Then, all 'inscriptionese' (e.g. '/', brackets, etc.) is removed,
-    and all spaces, characters, and missing indicators (i.e. "[3]" etc.)
-    are added to the result, which is split at whitespace,
-    and joined with a whitespace, and then returned.
+    Corrects the text and removes superficial letters (both only change
+    texts containing edits). Then, all 'inscriptionese' (e.g. '/', brackets,
+    etc.) is removed by keeping only letters, whitespace, and missing
+    indicators (i.e. "[3]" etc.) in a single regex pass. The result is
+    split at whitespace, and joined with a whitespace, and then returned.
     """
-    result = ''
-    equals = text.find('=')  # text contains corrected letters
-    curly = text.find('{')  # text contains superficial letters
-    if equals != -1:  # text contains corrected letters
-        text = correct_text(text)
-    if curly != -1:  # text contains superficial letters
-        text = remove_superficial_letters(text)
-    for i in range(len(text)):  # remove all inscriptionese (e.g. '/', brackets)
-        if text[i].isspace() or text[i].isalpha() or missing(text, i):
-            result += text[i]
-    result = " ".join(result.split())
-    return result
+    text = remove_superficial_letters(correct_text(text))
+    result = ''.join(CLEAN.findall(text))
+    return " ".join(result.split())
 
 
-def get_lat(place):
-    """
-    Extracts the latitude from the place-link.
-    Takes in some html code with details about the findspot.
-    Searches for the latitude-tag.
-    From the end of it until the end of the string, appends
-    all numeric characters, full stops, and minus signs to the result.
-    Once something else is found, tries to return result as float or string.
-    """
-    result = ''
-    start = place.find("latitude=")
-    if start == -1:
-        return np.nan
-    for i in range(start + 9, len(place)):
-        if place[i].isnumeric() or place[i] == "." or place[i] == "-":
-            result += place[i]
-        else:
-            try:
-                return float(result)
-            except ValueError:
-                return result
-
-
-def get_long(place):
+def get_coordinates(place):
     """
-    Extracts the longitude from the place-link.
+    Extracts the latitude and longitude from the place-link.
     Takes in some html code with details about the findspot.
-    Searches for the latitude-tag.
-    From the end of it until the end of the string, appends
-    all numeric characters, full stops, and minus signs to the result.
-    Once something else is found, tries to return result as float or string.
+    Searches for the numbers following the latitude- and longitude-tags
+    in a single pass.
+    Returns both as floats, or NaN where a tag is missing.
     """
-    result = ''
-    start = place.find("longitude=")
-    if start == -1:
-        return np.nan
-    for i in range(start + 10, len(place)):
-        if place[i].isnumeric() or place[i] == "." or place[i] == "-":
-            result += place[i]
-        else:
-            try:
-                return float(result)
-            except ValueError:
-                return result
+    coordinates = {}
+    for match in COORDINATES.finditer(place):
+        coordinates.setdefault(match.group(1), float(match.group(2)))
+    return coordinates.get('lat', np.nan), coordinates.get('long', np.nan)
 
 
 def get_date(snippet, smallest):
     """
     Extracts the smallest or largest number from a dictionary.
     Takes in a dictionary containing a snippet of an inscriptions.
-    Tries to convert each element to an integer and add it to a list.
-    From each successful try, the smallest or largest element is returned,
+    Strips each element of all non-digits and converts what is left
+    to an integer, skipping elements without digits.
+    The smallest or largest of these numbers is returned,
     depending on what is searched.
     """
-    numbers = []
-    for elem in snippet:
-        try:
-            elem = re.sub(r'\D', '', elem)
-            numbers.append(int(elem))
-        except ValueError:
-            pass
+    digits = (NON_DIGIT.sub('', elem) for elem in snippet)
+    numbers = [int(number) for number in digits if number]
     if numbers:
         if smallest:
             return min(numbers)
@@ -184,42 +128,31 @@ def get_date(snippet, smallest):
     return np.nan
 
 
-def get_insc_dict(inscs):
+def get_insc_chunk(inscs, count):
     """
-    Transforms each inscription into a dict and combines all to master dict
-    Takes in the list of inscriptions, each as a list itself.
+    Transforms each inscription of a chunk into a dict.
+    Takes in a list of inscriptions, each as a list itself, and the number
+    of inscriptions to transform. The inscriptions after these are only
+    read as possible continuations of a comment.
     For each inscription (each list element), the function matches each element
     to a dictionary.
-    Creates master dictionary and adds all inscriptions as elements.
-    Returns master dictionary.
+    Returns a list of (EDCS-ID, dictionary) pairs.
     """
-    insc_dict = {}
+    chunk = []
     total = len(inscs)
-    # loop over all inscriptions in list
-    for i, insc in enumerate(inscs):
-        if i > 0 and i % 10000 == 0:
-            print(f'Added to dictionary: {i} inscriptions (ca. ',
-                  f'{round(100 / total * i, 2)}%)')
+    # positions of real inscriptions, to find where a comment ends
+    real = [j for j, insc in enumerate(inscs) if 'EDCS-ID:' in insc]
+    # loop over all inscriptions in chunk
+    for i in range(count):
+        insc = inscs[i]
         # check if inscription has a EDCS-ID. If not, continue with next.
-        if "EDCS-ID:" not in insc:
+        try:
+            edcs_idx = insc.index('EDCS-ID:')
+        except ValueError:
             continue
         edcs_id = ''
-        # create dictionary for inscription
-        inscription = {
-            "publication": "n/a",
-            "edcs-id": np.nan,
-            "time_from": np.nan,
-            "time_to": np.nan,
-            "province": "n/a",
-            "findspot": "n/a",
-            "find_lat": np.nan,
-            "find_long": np.nan,
-            "text": "n/a",
-            "cleantext": "n/a",
-            "keywords": "n/a",
-            "material": "n/a",
-            "comment": "n/a",
-        }
+        # create dictionary for inscription (values are immutable)
+        inscription = INSCRIPTION.copy()
         # iterate over inscription elements; add matching ones to dictionary.
         for idx, elem in enumerate(insc):
             match elem:
@@ -227,7 +160,7 @@ def get_insc_dict(inscs):
                     inscription["publication"] = insc[idx + 1]
                 case 'Datierung:':
                     # assume multiple dates are available: find extremes
-                    snippet = insc[idx:insc.index('EDCS-ID:')]
+                    snippet = insc[idx:edcs_idx]
                     inscription["time_from"] = get_date(snippet, True)
                     inscription["time_to"] = get_date(snippet, False)
                 case 'EDCS-ID:':
@@ -242,8 +175,8 @@ def get_insc_dict(inscs):
                         inscription["findspot"] = insc[idx + 2]
                         # extract coordinates if there is a comment
                         place = insc[idx + 1]
-                        inscription["find_lat"] = get_lat(place)
-                        inscription["find_long"] = get_long(place)
+                        inscription["find_lat"], inscription["find_long"] = \
+                            get_coordinates(place)
                         # text is always element after findspot
                         inscription["text"] = insc[idx + 4]
                     else:
@@ -265,47 +198,93 @@ def get_insc_dict(inscs):
                 case 'Kommentar' | 'Kommentar:':  # both exist in EDCS
                     # if comment contains link or consists of mult. paragraphs,
                     # it is scraped as multiple elements or inscriptions
-                    comment_list = []
-                    for j in range(1, 100):
-                        if idx + j < len(insc):
-                            comment_list.append(insc[idx + j])
-                        else:
-                            break
-                    # check if next 'inscription' is actually continued comment
-                    for k in range(1, 100):
-                        if i + k < len(inscs) and 'EDCS-ID:' not in inscs[i + k]:
-                            # if not, add all 'inscriptions' to comment,
-                            # until real inscription is found.
-                            for element in inscs[i + k]:
-                                comment_list.append(element)
-                        else:
-                            break
+                    comment_list = insc[idx + 1:]
+                    # all 'inscriptions' until the next real inscription
+                    # are actually continued comment: add them to comment.
+                    k = bisect.bisect_right(real, i)
+                    end = real[k] if k < len(real) else total
+                    for continued in inscs[i + 1:end]:
+                        comment_list.extend(continued)
                     # add all comment elements to comment
                     inscription["comment"] = ' '.join(comment_list)
-            # create cleantext from raw text
-            inscription["cleantext"] = get_cleantext(inscription["text"])
-        # add inscription to dictionary of all inscriptions
-        insc_dict[edcs_id] = inscription
+        # create cleantext from raw text
+        inscription["cleantext"] = get_cleantext(inscription["text"])
+        chunk.append((edcs_id, inscription))
+    return chunk
+
+
+def get_insc_dict(inscs, chunksize=10000):
+    """
+    Transforms each inscription into a dict and combines all to master dict
+    Takes in the list of inscriptions, each as a list itself.
+    Splits the list into chunks, each extended up to the next real
+    inscription for comments continued over several 'inscriptions', and
+    transforms the chunks on all cores with get_insc_chunk.
+    Collects all inscriptions in a master dictionary keyed by EDCS-ID
+    (a repeated EDCS-ID overwrites the earlier inscription).
+    Returns the inscriptions as a list of dictionaries (records).
+    """
+    insc_dict = {}
+    total = len(inscs)
+    real = [j for j, insc in enumerate(inscs) if 'EDCS-ID:' in insc]
+    starts = range(0, total, chunksize)
+    ends = (bisect.bisect_left(real, start + chunksize) for start in starts)
+    windows = (inscs[start:real[k] if k < len(real) else total]
+               for start, k in zip(starts, ends))
+    counts = (min(chunksize, total - start) for start in starts)
+    with ProcessPoolExecutor() as executor:
+        chunks = executor.map(get_insc_chunk, windows, counts)
+        for start, chunk in zip(starts, chunks):
+            # add inscriptions to dictionary of all inscriptions
+            insc_dict.update(chunk)
+            done = min(start + chunksize, total)
+            print(f'Added to dictionary: {done} inscriptions (ca. ',
+                  f'{round(100 / total * done, 2)}%)')
     print(f'Dictionary completed containing {len(insc_dict)} inscriptions.')
-    return insc_dict
+    return list(insc_dict.values())
+
+
+def split_markup(insc):
+    """
+    Splits the html sourcetext of an inscription into its text pieces,
+    as html.parser finds them.
+    Takes in the html sourcetext of an inscription.
+    The text between tags is unescaped, the text of each comment is
+    kept verbatim. A comment which is never closed (e.g. a commented-out
+    map link, '<!-- <a href=...>') stays part of the text, verbatim up to
+    the next '>', and so does a tag which is never closed.
+    Returns the list of pieces.
+    """
+    pieces = []
+    text = ''
+    start = 0
+    for match in MARKUP.finditer(insc):
+        text += html.unescape(insc[start:match.start()])
+        start = match.end()
+        if match.group('open') is not None:
+            text += match.group('open')
+            continue
+        pieces.append(text)
+        text = ''
+        if match.group('comment') is not None:
+            pieces.append(match.group('comment'))
+    pieces.append(text + html.unescape(insc[start:]))
+    return pieces
 
 
 def clean(insc):
     """
     Cleans the sourcetext of one inscription into workable list.
     Takes in the html sourcetext of an inscription.
-    Parses the html using beautifulsoup,
-    and creates a content variable containing all text without tags.
-    For each element in content, if it is not a line break, empty,
-    a colon, or the EDCS-ID, the element is stripped of non-breaking spaces,
+    Splits the html into its text pieces (see split_markup).
+    For each piece, if it is not a line break, empty, a colon,
+    or the EDCS-ID, the piece is stripped of non-breaking spaces,
     split at whitespace, and joined with a whitespace.
-    If the element now is not empty, it is appended to a result,
-    and once all elements in content are cleaned, result is returned.
+    If the piece now is not empty, it is appended to a result,
+    and once all pieces are cleaned, result is returned.
     """
-    soup = bs(insc, 'html.parser')
-    content = soup.find_all(text=True)
     result = []
-    for element in content:
+    for element in split_markup(insc):
         if not element == '\n' and not element == ' ' and not element == ':':
             nelement = element.replace("\xa0", "")
             melement = " ".join(nelement.split())
@@ -314,6 +293,21 @@ def clean(insc):
     return result
 
 
+def split_paragraphs(sourcetext):
+    """
+    Takes in the sourcetext as raw html.
+    Yields the pieces between '</p>'-tags one by one, so the whole
+    sourcetext is never copied into a list of paragraphs.
+    """
+    start = 0
+    end = sourcetext.find('</p>')
+    while end != -1:
+        yield sourcetext[start:end]
+        start = end + 4
+        end = sourcetext.find('</p>', start)
+    yield sourcetext[start:]
+
+
 def get_list(sourcetext):
     """
     Creates a list of inscriptions from sourcetext.
@@ -326,12 +320,11 @@ def get_list(sourcetext):
     to the console once every 1000 inscriptions.
     When done, returns the list with all inscriptions.
     """
-    inscs = sourcetext.split('</p>')
+    total = sourcetext.count('</p>') + 1
     print("Inscriptions split")
     inscs_cleaned = []
     counter = 0
-    total = len(inscs)
-    for insc in inscs:
+    for insc in split_paragraphs(sourcetext):
         # check if empty or search-metadata; if so, continue with next insc
         if insc == '' or 'Gefundene Inschriften:' in insc:
             continue
@@ -351,8 +344,9 @@ def save_list(inscriptions, today):
     Saves the list of inscriptions to a csv.
     """
     name = "EDCS_InscList_" + today.strftime('%Y-%m-%d') + ".csv"
-    with open(name, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
+    with open(name, "w", newline="", encoding="utf-8",
+              buffering=BUFFER_SIZE) as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
         writer.writerows(inscriptions)
         print(f"CSV from InscriptionList created: {name}.")
 
@@ -361,17 +355,20 @@ def open_list(date):
     """
     Opens list of inscriptions from csv.
     """
-    searching = True
-    while searching:
+    for _ in range(MAX_DAYS):
         date_str = date.strftime('%Y-%m-%d')
         filename = 'EDCS_InscList_' + date_str + '.csv'
         try:
-            with open(filename, newline="", encoding='utf-8') as f:
+            with open(filename, newline="", encoding='utf-8',
+                      buffering=BUFFER_SIZE) as f:
                 reader = csv.reader(f)
                 insc_list = list(reader)
-                searching = False
+            break
         except FileNotFoundError:
             date = (date - timedelta(days=1))
+    else:
+        raise FileNotFoundError("No inscription list found in the last "
+                                f"{MAX_DAYS} days.")
     print(f"Read inscription list: {filename}.")
     return insc_list
 
@@ -382,29 +379,39 @@ def open_sourcecode(date):
     EDCS sourcecode ('EDCS_HTML_allprovinces_DATE.txt').
     Once found, opens and returns it.
     """
-    searching = True
-    while searching:
+    for _ in range(MAX_DAYS):
         date_str = date.strftime('%Y-%m-%d')
         filename = 'EDCS_HTML_allprovinces_' + date_str + '.txt'
         try:
-            with open(filename, 'r', encoding='utf-8') as f:
+            with open(filename, 'r', encoding='utf-8',
+                      buffering=BUFFER_SIZE) as f:
                 sourcecode = f.read()
-            searching = False
+            break
         except FileNotFoundError:
             date = (date - timedelta(days=1))
+    else:
+        raise FileNotFoundError("No EDCS sourcecode found in the last "
+                                f"{MAX_DAYS} days.")
     print(f"Read EDCS sourcecode: {filename}.")
     return sourcecode
 
 
-def create_csv(inscription_dict, today):
+def create_csv(inscriptions, today):
     """
-    Takes in the dictionary of inscriptions.
-    Saves it to a csv.
+    Takes in the list of inscription dictionaries.
+    Saves it to a csv with pyarrow, which is much faster than pandas.
+    Unlike pandas' to_csv, pyarrow quotes the header and every string, and
+    writes whole-number floats without '.0' (e.g. a dating '100', not
+    '100.0'); pd.read_csv reads both into the same dataframe.
     """
     name = "EDCS_complete_" + today.strftime('%Y-%m-%d') + ".csv"
-    output = pd.DataFrame(inscription_dict)
-    output = output.transpose()
-    output.to_csv(name, index=False)
+    output = pd.DataFrame.from_records(inscriptions, columns=COLUMNS)
+    try:
+        table = pa.Table.from_pandas(output, preserve_index=False)
+        pacsv.write_csv(table, name)
+    except pa.ArrowException:
+        # columns holding mixed types are left to pandas
+        output.to_csv(name, index=False)
     print(f"CSV of EDCS created: {name}.")
 
 
@@ -416,15 +423,16 @@ def main():
 
     # transform sourcetext to a list of all inscriptions (each as a list itself)
     inscriptions = get_list(sourcetext)
+    del sourcetext
 
     # save inscription list to a csv
     save_list(inscriptions, today)
 
-    # transform list of all inscriptions to a dictionary of inscriptions
-    inscription_dict = get_insc_dict(inscriptions)
+    # transform list of all inscriptions to a list of inscription dictionaries
+    inscription_records = get_insc_dict(inscriptions)
 
     # save EDCS to a CSV
-    create_csv(inscription_dict, today)
+    create_csv(inscription_records, today)
 
 
 if __name__ == '__main__':
@@ -4,11 +4,15 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 
-PATH = r'D:\Uni\3-PhD\1-Dissertation\4-Webscraping\chromedriver.exe'
 URL = 'https://db.edcs.eu/epigr/epi.php?s_sprache=de'
+TIMEOUT = 86400  # seconds to wait for the (very large) results of a province
+MAX_DAYS = 30  # number of days to look back for a province's sourcecode
 PROVINCE_LIST = ['Achaia', 'Baetica', 'Galatia', 'Mauretania Tingitana',
                  'Regnum Bospori', 'Aegyptus', 'Barbaricum', 'Raetia',
                  'Gallia Narbonensis', 'Mesopotamia', 'Roma', 'Asia',
@@ -24,70 +28,96 @@ PROVINCE_LIST = ['Achaia', 'Baetica', 'Galatia', 'Mauretania Tingitana',
                  'Liguria / Regio IX', 'Pannonia inferior', 'Dalmatia',
                  'Transpadana / Regio XI', 'Apulia et Calabria / Regio II',
                  'Creta et Cyrenaica', 'Lugudunensis', 'Pannonia superior',
-                 'Umbria / Regio VI', 'Aquitania', 'Aquitanica' 'Cyprus',
+                 'Umbria / Regio VI', 'Aquitania', 'Aquitanica', 'Cyprus',
                  'Lusitania', 'Picenum / Regio V', 'Pontus et Bithynia',
                  'Venetia et Histria / Regio X', 'Provincia incerta',
                  'Lycia et Pamphylia', 'Etruria / Regio VII',
                  'Mauretania Caesariensis', 'Aquitani(c)a']
 
 
-def scrape_edcs(date):
+def scrape_provinces(provinces, driver_path, today):
     """
-    Scrapes the EDCS database on a province-by-province basis.
-    For each province which exists in the EDCS database,
-    a headless selenium chrome browser opens the EDCS website,
-    enters the province in the relevant search field,
-    waits until the results page is loaded,
+    Scrapes the EDCS database for a list of provinces with one browser.
+    A headless selenium chrome browser is started, and for each province,
+    it opens the EDCS website, enters the province in the relevant
+    search field, waits until the results page is loaded,
     copies the entire sourcecode, and saves it to a text-file.
+    The browser is closed once all provinces are saved.
     """
-    today = date.strftime('%Y-%m-%d')
     chrome_options = Options()
     chrome_options.add_argument("--headless")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()),
+    driver = webdriver.Chrome(service=Service(driver_path),
                               options=chrome_options)
-    driver.set_page_load_timeout(86400)
-    for province in PROVINCE_LIST:
-        print(province)
-        driver.get(URL)
-        search_bar = driver.find_element(By.NAME, 'p_provinz')
-        search_bar.clear()
-        search_bar.send_keys(province)
-        search_bar.send_keys(Keys.RETURN)
-        sourcetext = driver.page_source
-        province = province.replace('/', '-')
-        name = "EDCS_HTML_" + province + '_' + today + ".txt"
-        with open(name, 'w', encoding="utf-8") as f:
-            f.write(sourcetext)
+    try:
+        driver.set_page_load_timeout(TIMEOUT)
+        for province in provinces:
+            print(province)
+            driver.get(URL)
+            search_bar = driver.find_element(By.NAME, 'p_provinz')
+            search_bar.clear()
+            search_bar.send_keys(province)
+            search_bar.send_keys(Keys.RETURN)
+            sourcetext = driver.page_source
+            province = province.replace('/', '-')
+            name = "EDCS_HTML_" + province + '_' + today + ".txt"
+            with open(name, 'w', encoding="utf-8") as f:
+                f.write(sourcetext)
+    finally:
+        driver.quit()
+
+
+def scrape_edcs(date, workers=2):
+    """
+    Scrapes the EDCS database on a province-by-province basis.
+    Splits the provinces which exist in the EDCS database between a few
+    headless browsers, which scrape their share of the provinces
+    in parallel threads (see scrape_provinces).
+    """
+    today = date.strftime('%Y-%m-%d')
+    driver_path = ChromeDriverManager().install()
+    shares = [PROVINCE_LIST[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(scrape_provinces, share, driver_path, today)
+                   for share in shares if share]
+        for future in futures:
+            future.result()
+
+
+def find_sourcetext(province, today):
+    """
+    Starting from today, looks for the most recent HTML-file of a province
+    ('EDCS_HTML_PROVINCE_DATE.txt') and returns its filename.
+    """
+    province = province.replace('/', '-')
+    date = today
+    for _ in range(MAX_DAYS):
+        date_str = date.strftime('%Y-%m-%d')
+        filename = "EDCS_HTML_" + province + '_' + date_str + ".txt"
+        if os.path.exists(filename):
+            return filename
+        date = (date - timedelta(days=1))
+    raise FileNotFoundError(f"No sourcecode of {province} found "
+                            f"in the last {MAX_DAYS} days.")
 
 
 def merge_sourcetext(today):
     """
     Merges the sourcetext of different provinces into one file.
-    For each province in the PROVINCE_LIST, opens the corresponding
-    HTML-file and appends HTML code to a list.
-    Once all files are processed, the text from the sourcecode_list
-    is concatenated into one long string and saved to disk.
+    For each province in the PROVINCE_LIST, finds the corresponding
+    HTML-file. Then the files are copied one after another into one
+    file on disk, separated by a marker, without holding all of
+    them in memory.
     """
-    sourcetext_list = []
-    for province in PROVINCE_LIST:
-        province = province.replace('/', '-')
-        date = today
-        searching = True
-        while searching:
-            date_str = date.strftime('%Y-%m-%d')
-            filename = "EDCS_HTML_" + province + '_' + date_str + ".txt"
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    sourcecode = f.read()
-                searching = False
-            except FileNotFoundError:
-                date = (date - timedelta(days=1))
-        sourcetext_list.append(sourcecode)
-    complete_text = '\n\nNEW PROVINCE\n\n'.join(sourcetext_list)
+    filenames = [find_sourcetext(province, today)
+                 for province in PROVINCE_LIST]
     today_str = today.strftime('%Y-%m-%d')
     name = 'EDCS_HTML_allprovinces_' + today_str + '.txt'
-    with open(name, 'w', encoding='utf-8') as f:
-        f.write(complete_text)
+    with open(name, 'w', encoding='utf-8') as out:
+        for i, filename in enumerate(filenames):
+            if i > 0:
+                out.write('\n\nNEW PROVINCE\n\n')
+            with open(filename, 'r', encoding='utf-8') as f:
+                shutil.copyfileobj(f, out)
 
 
 def main():
@@ -0,0 +1,55 @@
+import EDCS_S_Extract as extract
+
+
+# an EDCS record whose findspot carries a commented-out map link; the comment
+# is never closed, so html parsers keep it as text up to the next '>'
+RECORD = (
+    '<b>Publikation:</b> CIL 02, 00519 = D 01879&nbsp; '
+    '<b>Datierung:</b> 1 bis 100; &nbsp; <b>EDCS-ID:</b> EDCS-05500519<br>\n'
+    '<b>Provinz:</b> Lusitania &nbsp; <b>Ort:</b> '
+    '<!-- <a href="https://db.edcs.eu/epigr/karte.php?ort=Emerita'
+    '&latitude=38.916&longitude=-6.343" target=_blank>'
+    '<img src="karte.gif"></a> Emerita Augusta / Merida '
+    '<a href="ort.php?o=1">(Lusitania)</a><br>\n'
+    'D(is) M(anibus) s(acrum) / Iuliae &lt;e=I&gt;ucundae<br>\n'
+    '<b>Inschriftengattung / Personenstatus:</b> tituli sepulcrales; '
+    'mulieres &nbsp; <b>Material:</b> lapis')
+MAP_LINK = ('<!-- <a href="https://db.edcs.eu/epigr/karte.php?ort=Emerita'
+            '&latitude=38.916&longitude=-6.343" target=_blank>')
+
+
+def test_clean_keeps_unclosed_comment_verbatim():
+    assert extract.clean(RECORD) == [
+        'Publikation:', 'CIL 02, 00519 = D 01879', 'Datierung:',
+        '1 bis 100;', 'EDCS-ID:', 'EDCS-05500519', 'Provinz:', 'Lusitania',
+        'Ort:', MAP_LINK, 'Emerita Augusta / Merida', '(Lusitania)',
+        'D(is) M(anibus) s(acrum) / Iuliae <e=I>ucundae',
+        'Inschriftengattung / Personenstatus:', 'tituli sepulcrales; mulieres',
+        'Material:', 'lapis']
+
+
+def test_clean_merges_unclosed_comment_with_following_text():
+    insc = ('<b>Ort:</b> <!-- <a href="karte.php?latitude=41.1&longitude=2.3"'
+            ' target=_blank> Emerita<br>text')
+    assert extract.clean(insc) == [
+        'Ort:',
+        '<!-- <a href="karte.php?latitude=41.1&longitude=2.3" target=_blank>'
+        ' Emerita',
+        'text']
+
+
+def test_clean_keeps_closed_comment_text_verbatim():
+    insc = 'a <!-- x &amp; <b>y</b> --> b &amp; c<!-- d --\n>e'
+    assert extract.clean(insc) == ['a', 'x &amp; <b>y</b>', 'b & c', 'd', 'e']
+
+
+def test_insc_chunk_reads_findspot_and_coordinates():
+    [(edcs_id, inscription)] = extract.get_insc_chunk(
+        [extract.clean(RECORD)], 1)
+    assert edcs_id == 'EDCS-05500519'
+    assert inscription['findspot'] == 'Emerita Augusta / Merida'
+    assert inscription['find_lat'] == 38.916
+    assert inscription['find_long'] == -6.343
+    assert inscription['text'] == \
+        'D(is) M(anibus) s(acrum) / Iuliae <e=I>ucundae'
+    assert inscription['material'] == 'lapis'